@@ -8,6 +8,7 @@ Version with automatic retry logic and rate limit handling for Azure OpenAI.
 
 import asyncio
 import argparse
+import random
 import sys
 import time
 from pathlib import Path
@@ -21,23 +22,56 @@ from src.enhanced_agents import fast, meeting_fast, adaptive_segment_content
 class RateLimitHandler:
     """Handle rate limiting and retries for Azure OpenAI."""
     
-    def __init__(self, max_retries: int = 3, base_delay: int = 60):
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: int = 60,
+        backoff_factor: float = 2.0,
+        max_delay: Optional[int] = None,
+        jitter: bool = False
+    ):
         self.max_retries = max_retries
         self.base_delay = base_delay
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.jitter = jitter
         self.retry_count = 0
     
+    def _retry_delay(self, attempt: int) -> int:
+        """Exponential backoff, optionally jittered and capped at max_delay."""
+        
+        delay = self.base_delay * (self.backoff_factor ** attempt)
+        
+        # Jitter spreads out retries from concurrent segments hitting the same limit
+        if self.jitter:
+            delay += random.uniform(0, self.base_delay)
+        
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        
+        return int(delay)
+    
     async def execute_with_retry(self, operation, *args, **kwargs):
         """Execute operation with automatic retry on rate limits."""
         
+        result, self.retry_count = await self.execute_with_retry_count(operation, *args, **kwargs)
+        return result
+    
+    async def execute_with_retry_count(self, operation, *args, **kwargs):
+        """Like execute_with_retry, but return (result, retries) for this call only.
+        
+        Does not touch shared state, so concurrent calls on one handler can
+        each report their own retries.
+        """
+        
         for attempt in range(self.max_retries + 1):
             try:
-                self.retry_count = attempt
                 result = await operation(*args, **kwargs)
                 
                 if attempt > 0:
                     print(f"✅ Recovered after {attempt} retries")
                 
-                return result
+                return result, attempt
                 
             except Exception as e:
                 error_str = str(e)
@@ -54,7 +88,7 @@ class RateLimitHandler:
                 if is_rate_limit:
                     if attempt < self.max_retries:
                         # Calculate delay with exponential backoff
-                        delay = self.base_delay * (2 ** attempt)
+                        delay = self._retry_delay(attempt)
                         
                         print(f"🚨 Rate limit hit (attempt {attempt + 1}/{self.max_retries + 1})")
                         print(f"📝 Error details: {error_str[:200]}...")
@@ -11,6 +11,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Tuple, Optional
 from pathlib import Path
 from mcp_agent.core.fastagent import FastAgent
+from mcp_agent.core.request_params import RequestParams
 import yaml
 
 
@@ -341,7 +342,10 @@ CRITICAL RULES:
 - Always include Q&A section with meeting-specific questions
 - Use Spanish throughout the response
 - Quote specific phrases when referencing decisions or commitments
-"""
+""",
+    # Each segment is sent in the same session: without this, every prompt
+    # would carry all earlier segments and their replies
+    request_params=RequestParams(use_history=False)
 )
 def meeting_processor():
     pass
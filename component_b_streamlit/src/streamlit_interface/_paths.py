@@ -0,0 +1,18 @@
+"""
+Rutas del proyecto
+==================
+
+Resuelve la raíz del proyecto una sola vez y la añade a sys.path para que
+las páginas puedan usar imports absolutos ``src.streamlit_interface...``.
+Streamlit añade el directorio de app.py a sys.path, por lo que este módulo
+se importa como ``_paths`` desde la app y desde cada página.
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+_root = str(PROJECT_ROOT)
+if _root not in sys.path:
+    sys.path.insert(0, _root)
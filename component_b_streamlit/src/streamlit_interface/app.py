@@ -13,9 +13,14 @@ from pathlib import Path
 from typing import Optional
 
 # Configurar imports absolutos
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+try:
+    # Ejecutado con `streamlit run app.py`
+    import _paths  # noqa: F401
+except ImportError:
+    # Importado como paquete
+    from . import _paths  # noqa: F401
 
-from src.streamlit_interface.core.config_manager import ConfigManager
+from src.streamlit_interface.core.config_manager import get_config_manager
 from src.streamlit_interface.components.ui_components import setup_page_config, show_sidebar, show_header
 
 def setup_streamlit_app():
@@ -24,10 +29,6 @@ def setup_streamlit_app():
     # Configuración básica de la página
     setup_page_config()
     
-    # Inicializar el gestor de configuración
-    if 'config_manager' not in st.session_state:
-        st.session_state.config_manager = ConfigManager()
-    
     # Mostrar header principal
     show_header()
     
@@ -75,7 +76,7 @@ def main():
     """)
     
     # Status de configuración
-    config = st.session_state.config_manager.get_config()
+    config = get_config_manager().get_config()
     
     st.markdown("### 📋 Estado del Sistema")
     
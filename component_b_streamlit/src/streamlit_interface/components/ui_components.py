@@ -6,9 +6,19 @@ Componentes de interfaz reutilizables para la aplicación Streamlit.
 """
 
 import streamlit as st
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence, Union
+from dataclasses import dataclass
 import time
 
+from src.streamlit_interface.core.config_manager import get_config_manager, cached_validation
+
+@dataclass(frozen=True, slots=True)
+class Metric:
+    """Métrica para show_metrics_cards."""
+    name: str
+    value: Any = 0
+    delta: Optional[str] = None
+
 def setup_page_config():
     """Configura la página de Streamlit."""
     st.set_page_config(
@@ -43,18 +53,17 @@ def show_sidebar():
         st.markdown("### 📊 Estado del Sistema")
 
         # Verificar configuración
-        if 'config_manager' in st.session_state:
-            validation = st.session_state.config_manager.validate_config()
+        validation = cached_validation(get_config_manager())
 
-            if validation['has_provider']:
-                st.success("✅ Proveedor configurado")
-            else:
-                st.error("❌ Sin proveedor LLM")
+        if validation['has_provider']:
+            st.success("✅ Proveedor configurado")
+        else:
+            st.error("❌ Sin proveedor LLM")
 
-            if validation['valid_model']:
-                st.success("✅ Modelo válido")
-            else:
-                st.warning("⚠️ Modelo no configurado")
+        if validation['valid_model']:
+            st.success("✅ Modelo válido")
+        else:
+            st.warning("⚠️ Modelo no configurado")
 
         st.markdown("---")
 
@@ -91,9 +100,9 @@ def show_sidebar():
 
 def show_config_status(config_manager) -> bool:
     """Muestra el estado de configuración y retorna si está lista."""
-    validation = config_manager.validate_config()
+    validation = cached_validation(config_manager)
 
-    if all(validation.values()):
+    if validation['all_ok']:
         st.success("✅ Sistema configurado correctamente")
         return True
     else:
@@ -336,7 +345,7 @@ def show_file_uploader(accepted_types: List[str], max_size_mb: int = 10) -> Opti
 
     if uploaded_file:
         # Verificar tamaño
-        file_size_mb = len(uploaded_file.getvalue()) / (1024 * 1024)
+        file_size_mb = uploaded_file.size / (1024 * 1024)
         if file_size_mb > max_size_mb:
             st.error(f"❌ Archivo muy grande: {file_size_mb:.1f}MB. Máximo permitido: {max_size_mb}MB")
             return None
@@ -348,8 +357,8 @@ def show_file_uploader(accepted_types: List[str], max_size_mb: int = 10) -> Opti
 
     return None
 
-def show_download_button(content: str, filename: str, label: str = "Descargar"):
-    """Muestra un botón de descarga."""
+def show_download_button(content: Union[str, bytes], filename: str, label: str = "Descargar"):
+    """Muestra un botón de descarga (acepta bytes ya codificados para evitar recodificar)."""
     st.download_button(
         label=f"📥 {label}",
         data=content,
@@ -357,17 +366,13 @@ def show_download_button(content: str, filename: str, label: str = "Descargar"):
         mime="text/plain" if filename.endswith('.txt') else "text/markdown"
     )
 
-def show_metrics_cards(metrics: Dict[str, Any]):
+def show_metrics_cards(metrics: Sequence[Metric]):
     """Muestra métricas en tarjetas."""
     cols = st.columns(len(metrics))
 
-    for i, (key, value) in enumerate(metrics.items()):
-        with cols[i]:
-            st.metric(
-                label=key,
-                value=value.get('value', 0),
-                delta=value.get('delta', None)
-            )
+    for col, metric in zip(cols, metrics):
+        with col:
+            st.metric(label=metric.name, value=metric.value, delta=metric.delta)
 
 def show_expandable_content(title: str, content: str, expanded: bool = False):
     """Muestra contenido expandible."""
@@ -7,12 +7,116 @@ Maneja la comunicación asíncrona y el procesamiento de contenido.
 """
 
 import asyncio
+import collections
+import concurrent.futures
+import threading
 import streamlit as st
-import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO
 import tempfile
+import shutil
 import os
+import functools
+import re
+import time
+from datetime import datetime
+
+# Intervalo mínimo entre actualizaciones de la barra de progreso (segundos)
+PROGRESS_MIN_INTERVAL = 0.1
+
+# Formato de la fecha de generación en la cabecera del documento
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Agentes seleccionables desde la UI y su descripción, en orden de presentación
+AGENT_DESCRIPTIONS = {
+    "simple_processor": "Procesador general para contenido educativo lineal. Ideal para conferencias, clases y presentaciones.",
+    "meeting_processor": "Procesador especializado para reuniones diarizadas. Extrae decisiones, action items y participantes."
+}
+
+# Agentes declarados con use_history=False: varios envíos concurrentes pueden
+# compartir su sesión porque cada uno lleva solo su propio prompt
+_HISTORY_FREE_AGENTS = frozenset({"simple_processor", "meeting_processor"})
+
+# Primera línea que sirve de título: un encabezado # o ## o, en su defecto,
+# una línea de más de 10 caracteres que no empiece con negrita
+_TITLE_RE = re.compile(
+    r"^[^\S\n]*(?:(?P<heading>#{1,2}(?!#).*?)|(?P<line>(?!\*\*)\S.{9,}?\S))[^\S\n]*$",
+    re.MULTILINE
+)
+
+# Palabras clave que marcan el inicio de la sección Q&A de un segmento
+_QA_KEYWORD_RE = re.compile(r"pregunta|respuesta|¿|\?|q&a", re.IGNORECASE)
+
+# Contextos multimodales más largos se recortan por segmento a los pasajes relevantes
+CONTEXT_TRIM_THRESHOLD = 4000
+
+# Palabras candidatas para relacionar pasajes y segmentos
+_KEYWORD_RE = re.compile(r"\w{4,}")
+
+# Palabras vacías (español e inglés) que no cuentan como coincidencia
+_STOPWORDS = frozenset("""
+    algo algunas algunos ante antes aquel aquella aquellas aquellos aquí
+    cada casi como con contra cual cuales cuando cuanto desde donde durante
+    ella ellas ellos entonces entre esas ese eso esos esta estaba estaban
+    estado estamos estan están estar este esto estos estoy fue fueron había
+    habían hace hacen hacer hacia hasta hay lugar mientras misma mismas
+    mismo mismos mucho muchos muy nada ningún ninguna ninguno nosotros
+    nuestra nuestro otra otras otro otros para pero poco por porque puede
+    pueden pues que quien quienes ser será sido siempre sobre solo sólo
+    somos son tal también tampoco tanto tener tiene tienen toda todas todo
+    todos tras una unas uno unos usted ustedes vamos vez
+    about after also been before being between both could does doing each
+    from have having here into just more most only other over same should
+    some such than that their them then there these they this those through
+    under very were what when where which while will with would your
+""".split())
+
+
+def _keywords(text: str) -> frozenset:
+    """Palabras significativas de un texto, en minúsculas y sin palabras vacías."""
+    return frozenset(_KEYWORD_RE.findall(text.lower())) - _STOPWORDS
+
+
+def _split_context(multimodal_context: str) -> List[Tuple[str, Optional[frozenset]]]:
+    """
+    Divide el contexto multimodal en pasajes separados por línea en blanco.
+
+    Los pasajes estructurales (cabeceras --- y avisos •) llevan None en lugar
+    de palabras clave: se conservan siempre.
+    """
+    passages = []
+    for passage in multimodal_context.split("\n\n"):
+        stripped = passage.lstrip()
+        structural = stripped.startswith(("---", "•"))
+        passages.append((passage, None if structural else _keywords(passage)))
+    return passages
+
+
+def _relevant_context(passages: List[Tuple[str, Optional[frozenset]]], segment: str) -> str:
+    """Une los pasajes estructurales y los que comparten palabras con el segmento."""
+    segment_words = _keywords(segment)
+    return "\n\n".join(
+        passage for passage, words in passages
+        if words is None or not words.isdisjoint(segment_words)
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _get_builder():
+    """Retorna el MultimodalContextBuilder compartido (import diferido)."""
+    from src.utils.multimodal_context import MultimodalContextBuilder
+    return MultimodalContextBuilder()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_agent_modules():
+    """Importa una sola vez los agentes FastAgent; un fallo no se cachea y se reintenta."""
+    # Importar módulos FastAgent desde la estructura src/
+    from src.agents.specialized_agents import fast as specialized_fast
+    from src.enhanced_agents import meeting_fast, adaptive_segment_content
+    from robust_main import RateLimitHandler
+    return specialized_fast, meeting_fast, adaptive_segment_content, RateLimitHandler
+
 
 class AgentInterface:
     """Interfaz para comunicarse con FastAgent."""
@@ -25,17 +129,22 @@ class AgentInterface:
     async def _initialize_agents(self):
         """Inicializa los agentes FastAgent."""
         try:
-            # Importar módulos FastAgent desde la estructura src/
-            from src.agents.specialized_agents import fast as specialized_fast
-            from src.enhanced_agents import meeting_fast, adaptive_segment_content
-            from robust_main import RateLimitHandler
+            (
+                self._fast_agent,
+                self._meeting_agent,
+                self._adaptive_segment,
+                RateLimitHandler
+            ) = _load_agent_modules()
             
-            self._fast_agent = specialized_fast
-            self._meeting_agent = meeting_fast
-            self._adaptive_segment = adaptive_segment_content
+            # El backoff sigue la configuración de rate limiting; el jitter evita
+            # que los segmentos concurrentes reintenten todos a la vez
+            rate_config = self.config_manager.get_rate_limiting_config()
             self._rate_limit_handler = RateLimitHandler(
                 max_retries=3,
-                base_delay=60
+                base_delay=60,
+                backoff_factor=rate_config.backoff_factor,
+                max_delay=rate_config.max_backoff,
+                jitter=True
             )
             
             return True
@@ -49,7 +158,8 @@ class AgentInterface:
         content: str,
         documents: Optional[List[str]] = None,
         progress_callback=None,
-        agent_override: Optional[str] = None
+        agent_override: Optional[str] = None,
+        segment_callback=None
     ) -> Dict[str, Any]:
         """
         Procesa contenido usando FastAgent.
@@ -59,6 +169,7 @@ class AgentInterface:
             documents: Lista de rutas a documentos adicionales
             progress_callback: Función para reportar progreso
             agent_override: Agente específico a usar (opcional)
+            segment_callback: Función llamada con cada segmento en cuanto termina
         
         Returns:
             Dict con resultado del procesamiento
@@ -83,11 +194,20 @@ class AgentInterface:
                 progress_callback(f"Procesando {len(segments)} segmentos...", 0.3)
             
             # Paso 2: Configurar contexto multimodal
-            multimodal_context = self._prepare_multimodal_context(documents)
+            multimodal_context = await self._prepare_multimodal_context(documents)
+
+            # Un contexto grande se recorta por segmento para no repetirlo entero
+            # en cada prompt (los agentes de procesamiento se declaran con
+            # use_history=False: cada envío lleva solo su propio prompt)
+            context_passages = None
+            if len(multimodal_context) > CONTEXT_TRIM_THRESHOLD:
+                context_passages = _split_context(multimodal_context)
             
             # Paso 3: Procesamiento por segmentos con rate limiting
-            processed_segments = []
             total_segments = len(segments)
+            completed = 0
+            in_flight = 0
+            retry_count = 0
             
             # Seleccionar el agente FastAgent apropiado
             if recommended_agent == "meeting_processor":
@@ -95,51 +215,139 @@ class AgentInterface:
             else:
                 agent = self._fast_agent
             
-            for i, segment in enumerate(segments):
+            # Las llamadas al LLM son de red: varias en vuelo a la vez, hasta
+            # max_concurrent_segments (el ritmo por minuto lo limita wait_turn)
+            rate_config = self.config_manager.get_rate_limiting_config()
+            concurrency = min(rate_config.max_concurrent_segments, rate_config.requests_per_minute)
+            
+            # Un agente con historial mezclaría los turnos de segmentos
+            # concurrentes: se procesa segmento a segmento, cada uno en su sesión
+            shared_session = recommended_agent in _HISTORY_FREE_AGENTS
+            if not shared_session:
+                concurrency = 1
+            semaphore = asyncio.Semaphore(max(1, concurrency))
+            
+            # Ventana deslizante: nunca más de requests_per_minute envíos
+            # iniciados en 60 s. Tras un rate limit, además, delay_between_requests
+            # separa el inicio de dos envíos consecutivos
+            start_lock = asyncio.Lock()
+            recent_starts = collections.deque(maxlen=max(1, rate_config.requests_per_minute))
+            next_start = 0.0
+            throttled = False
+            
+            async def wait_turn():
+                nonlocal next_start
+                async with start_lock:
+                    now = time.monotonic()
+                    wait = next_start - now if throttled else 0.0
+                    if len(recent_starts) == recent_starts.maxlen:
+                        wait = max(wait, recent_starts[0] + 60 - now)
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    now = time.monotonic()
+                    recent_starts.append(now)
+                    if throttled:
+                        next_start = now + rate_config.delay_between_requests
+            
+            def start_throttling():
+                nonlocal throttled, next_start
+                if not throttled:
+                    throttled = True
+                    next_start = time.monotonic() + rate_config.delay_between_requests
+            
+            def report_progress():
+                # fast-agent no expone streaming de tokens: se informa de los
+                # segmentos en curso para que la espera no parezca detenida
                 if progress_callback:
-                    progress = 0.3 + (0.6 * (i + 1) / total_segments)
-                    progress_callback(f"Procesando segmento {i + 1}/{total_segments}...", progress)
+                    progress = 0.3 + (0.6 * completed / total_segments)
+                    progress_callback(
+                        f"Segmentos completados: {completed}/{total_segments} · en curso: {in_flight}",
+                        progress
+                    )
+            
+            async def process_segment(i: int, segment: str) -> Dict[str, Any]:
+                nonlocal completed, in_flight, retry_count
                 
-                # Procesar segmento con retry automático
-                try:
-                    async with agent.run() as agent_instance:
-                        segment_context = f"""
+                if context_passages is None:
+                    segment_multimodal = multimodal_context
+                else:
+                    segment_multimodal = _relevant_context(context_passages, segment)
+
+                segment_context = f"""
 Segmento {i + 1} de {total_segments}:
 
 {segment}
 
-{multimodal_context}
+{segment_multimodal}
 """
-                        
-                        # Para agentes especializados, usar la cadena de procesamiento
-                        if recommended_agent == "simple_processor":
-                            result = await self._rate_limit_handler.execute_with_retry(
-                                agent_instance.content_pipeline.send,
-                                segment_context
-                            )
-                        else:
-                            # Para meeting_processor mantener comportamiento original
-                            result = await self._rate_limit_handler.execute_with_retry(
-                                agent_instance.simple_processor.send,
+                
+                # Procesar segmento con retry automático; un error no cierra la sesión
+                try:
+                    async with semaphore:
+                        await wait_turn()
+                        in_flight += 1
+                        report_progress()
+                        try:
+                            result, retries = await self._rate_limit_handler.execute_with_retry_count(
+                                send,
                                 segment_context
                             )
-                        
-                        processed_segments.append({
-                            'segment_number': i + 1,
-                            'original_content': segment,
-                            'processed_content': result,
-                            'agent_used': recommended_agent
-                        })
+                        finally:
+                            in_flight -= 1
+                    
+                    # Cada llamada devuelve sus propios reintentos: se suman aquí
+                    retry_count += retries
+                    if retries:
+                        start_throttling()
+                    
+                    segment_result = {
+                        'segment_number': i + 1,
+                        'original_content': segment,
+                        'processed_content': result,
+                        'agent_used': recommended_agent
+                    }
                 
                 except Exception as e:
+                    start_throttling()
                     st.warning(f"Error procesando segmento {i + 1}: {e}")
-                    processed_segments.append({
+                    segment_result = {
                         'segment_number': i + 1,
                         'original_content': segment,
                         'processed_content': f"Error procesando segmento: {e}",
                         'agent_used': recommended_agent,
                         'error': True
-                    })
+                    }
+                
+                completed += 1
+                report_progress()
+                
+                # Publicar el segmento en la UI sin esperar al resto
+                if segment_callback:
+                    segment_callback(segment_result)
+                
+                return segment_result
+            
+            shared_send = None
+            
+            async def send(prompt: str):
+                if shared_send is not None:
+                    return await shared_send(prompt)
+                async with agent.run() as agent_instance:
+                    return await self._agent_send(agent_instance, recommended_agent)(prompt)
+            
+            async def process_all() -> List[Dict[str, Any]]:
+                # gather conserva el orden de los segmentos en el resultado
+                return list(await asyncio.gather(*(
+                    process_segment(i, segment) for i, segment in enumerate(segments)
+                )))
+            
+            if shared_session:
+                # Una sola sesión del agente para todos los segmentos
+                async with agent.run() as agent_instance:
+                    shared_send = self._agent_send(agent_instance, recommended_agent)
+                    processed_segments = await process_all()
+            else:
+                processed_segments = await process_all()
             
             if progress_callback:
                 progress_callback("Generando documento final...", 0.9)
@@ -160,7 +368,7 @@ Segmento {i + 1} de {total_segments}:
                 'segments': processed_segments,
                 'agent_used': recommended_agent,
                 'total_segments': total_segments,
-                'retry_count': self._rate_limit_handler.retry_count,
+                'retry_count': retry_count,
                 'original_content': content,
                 'multimodal_files': documents or []
             }
@@ -175,39 +383,45 @@ Segmento {i + 1} de {total_segments}:
                 'agent_used': recommended_agent if 'recommended_agent' in locals() else 'unknown'
             }
     
-    def _prepare_multimodal_context(self, documents: Optional[List[str]]) -> str:
+    @staticmethod
+    def _agent_send(agent_instance, agent_name: str):
+        """Devuelve el send del agente indicado dentro de una sesión abierta."""
+        # Para agentes especializados, usar la cadena de procesamiento; el
+        # resto se resuelve por su nombre (meeting_fast solo registra
+        # meeting_processor, no simple_processor)
+        if agent_name == "simple_processor":
+            return agent_instance.content_pipeline.send
+        return getattr(agent_instance, agent_name).send
+    
+    async def _prepare_multimodal_context(self, documents: Optional[List[str]]) -> str:
         """Prepara el contexto multimodal funcional para los agentes."""
         if not documents:
             return ""
 
         try:
-            from src.utils.multimodal_context import MultimodalContextBuilder
-
-            # Crear builder de contexto multimodal
-            builder = MultimodalContextBuilder()
+            builder = _get_builder()
 
             # Convertir rutas a objetos Path
             doc_paths = [Path(doc) for doc in documents if doc]
 
-            # Validar documentos
-            validation = builder.validate_documents(doc_paths)
+            # Validar y extraer los documentos en paralelo (uno por hilo)
+            outcomes = await asyncio.gather(*(
+                asyncio.to_thread(builder.classify_document, doc_path)
+                for doc_path in doc_paths
+            ))
+            validation = builder.group_extractions(doc_paths, outcomes)
 
             context_parts = ["\n--- CONTEXTO MULTIMODAL ---"]
 
             # Agregar contenido de documentos válidos
             for doc_path in validation["valid"]:
-                try:
-                    content = builder._extract_document_content(doc_path)
-                    if content and not content.startswith("[Error"):
-                        context_parts.extend([
-                            f"\n--- {doc_path.name} ---",
-                            content,
-                            ""
-                        ])
-                    else:
-                        context_parts.append(f"• {doc_path.name}: {content}")
-                except Exception as e:
-                    context_parts.append(f"• {doc_path.name}: Error extrayendo contenido - {e}")
+                # La cabecera va en su propio pasaje (línea en blanco) para que
+                # el recorte por segmento pueda descartar el contenido
+                context_parts.extend([
+                    f"\n--- {doc_path.name} ---\n",
+                    validation["contents"][doc_path],
+                    ""
+                ])
 
             # Reportar documentos con problemas
             if validation["invalid"]:
@@ -228,7 +442,7 @@ Segmento {i + 1} de {total_segments}:
             # Fallback al comportamiento anterior
             context_parts = ["\n--- CONTEXTO MULTIMODAL (MODO BÁSICO) ---"]
             for doc_path in documents:
-                doc_name = Path(doc_path).name
+                doc_name = os.path.basename(doc_path)
                 context_parts.append(f"• Documento disponible: {doc_name}")
             context_parts.append("--- FIN CONTEXTO MULTIMODAL ---\n")
             return "\n".join(context_parts)
@@ -245,53 +459,55 @@ Segmento {i + 1} de {total_segments}:
     ) -> str:
         """Ensambla el documento final a partir de los segmentos procesados."""
         
-        doc_parts = []
+        # Una sola pasada por los segmentos llena las tres secciones; el
+        # título se calcula una vez y se usa en la tabla y en Q&A
+        toc_parts = []
+        body_parts = []
+        qa_parts = []
+        
+        for segment in processed_segments:
+            number = segment['segment_number']
+            content = segment['processed_content']
+            
+            if segment.get('error', False):
+                body_parts.append(f"### Segmento {number}: Error\n")
+                body_parts.append(f"❌ {content}\n")
+                continue
+            
+            title = self._extract_title(content)
+            toc_parts.append(f"- [Segmento {number}: {title}](#segmento-{number})")
+            body_parts.extend((f"### Segmento {number}\n", content, "\n"))
+            
+            qa_content = self._extract_qa_content(content)
+            if qa_content:
+                qa_parts.extend((f"### Segmento {number}: {title}\n", qa_content, "\n"))
         
         # Header del documento
-        doc_parts.append("# Documento Procesado - FastAgent")
-        doc_parts.append(f"**Generado**: {self._get_timestamp()}")
-        doc_parts.append(f"**Segmentos procesados**: {len(processed_segments)}")
+        doc_parts = [
+            "# Documento Procesado - FastAgent",
+            f"**Generado**: {self._get_timestamp()}",
+            f"**Segmentos procesados**: {len(processed_segments)}"
+        ]
         
         if documents:
-            doc_parts.append(f"**Documentos adicionales**: {', '.join([Path(d).name for d in documents])}")
+            doc_parts.append(f"**Documentos adicionales**: {', '.join(map(os.path.basename, documents))}")
         
         doc_parts.append("\n---\n")
         
         # Tabla de contenidos
         doc_parts.append("## Tabla de Contenidos")
-        for segment in processed_segments:
-            if not segment.get('error', False):
-                # Extraer título del contenido procesado
-                title = self._extract_title(segment['processed_content'])
-                doc_parts.append(f"- [Segmento {segment['segment_number']}: {title}](#segmento-{segment['segment_number']})")
-        
+        doc_parts.extend(toc_parts)
         doc_parts.append("- [Preguntas y Respuestas](#preguntas-y-respuestas)")
         doc_parts.append("\n---\n")
         
         # Contenido principal
         doc_parts.append("## Contenido Principal\n")
+        doc_parts.extend(body_parts)
         
-        for segment in processed_segments:
-            if segment.get('error', False):
-                doc_parts.append(f"### Segmento {segment['segment_number']}: Error\n")
-                doc_parts.append(f"❌ {segment['processed_content']}\n")
-            else:
-                doc_parts.append(f"### Segmento {segment['segment_number']}\n")
-                doc_parts.append(segment['processed_content'])
-                doc_parts.append("\n")
-        
-        # Sección Q&A (extraer de los segmentos procesados)
+        # Sección Q&A (extraída de los segmentos procesados)
         doc_parts.append("\n---\n")
         doc_parts.append("## Preguntas y Respuestas\n")
-        
-        for segment in processed_segments:
-            if not segment.get('error', False):
-                qa_content = self._extract_qa_content(segment['processed_content'])
-                if qa_content:
-                    title = self._extract_title(segment['processed_content'])
-                    doc_parts.append(f"### Segmento {segment['segment_number']}: {title}\n")
-                    doc_parts.append(qa_content)
-                    doc_parts.append("\n")
+        doc_parts.extend(qa_parts)
         
         # Footer
         doc_parts.append("\n---\n")
@@ -301,34 +517,25 @@ Segmento {i + 1} de {total_segments}:
     
     def _extract_title(self, content: str) -> str:
         """Extrae el título de un segmento procesado."""
-        lines = content.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#') and not line.startswith('###'):
-                return line.lstrip('#').strip()
-            elif line and not line.startswith('**') and len(line) > 10:
-                return line[:50] + "..." if len(line) > 50 else line
-        return "Sin título"
+        match = _TITLE_RE.search(content)
+        if not match:
+            return "Sin título"
+        if match.group('heading') is not None:
+            return match.group('heading').lstrip('#').strip()
+        line = match.group('line')
+        return line[:50] + "..." if len(line) > 50 else line
     
     def _extract_qa_content(self, content: str) -> str:
         """Extrae la sección Q&A de un segmento procesado."""
-        lines = content.split('\n')
-        qa_section = []
-        in_qa_section = False
-        
-        for line in lines:
-            if any(keyword in line.lower() for keyword in ['pregunta', 'respuesta', '¿', '?', 'q&a']):
-                in_qa_section = True
-            
-            if in_qa_section:
-                qa_section.append(line)
-        
-        return '\n'.join(qa_section) if qa_section else ""
+        # La sección empieza en la primera línea con una palabra clave y llega al final
+        match = _QA_KEYWORD_RE.search(content)
+        if not match:
+            return ""
+        return content[content.rfind('\n', 0, match.start()) + 1:]
     
     def _get_timestamp(self) -> str:
         """Retorna timestamp formateado."""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return datetime.now().strftime(_TIMESTAMP_FORMAT)
     
     async def test_agent_connection(self, agent_name: str = "simple_processor") -> bool:
         """Prueba la conexión con un agente específico."""
@@ -336,10 +543,10 @@ Segmento {i + 1} de {total_segments}:
             if not await self._initialize_agents():
                 return False
             
-            # Test básico con el agente
+            # Abrir la sesión valida modelo, proveedor y servidores MCP
+            # sin enviar un mensaje real al LLM (no consume tokens)
             async with self._fast_agent.run() as agent:
-                result = await agent.content_pipeline.send("Test de conexión")
-                return result is not None
+                return agent is not None
                 
         except Exception as e:
             st.error(f"Error probando conexión: {e}")
@@ -347,62 +554,149 @@ Segmento {i + 1} de {total_segments}:
     
     def get_available_agents(self) -> List[str]:
         """Retorna lista de agentes disponibles."""
-        return [
-            "simple_processor",
-            "meeting_processor"
-        ]
+        return list(AGENT_DESCRIPTIONS)
     
     def get_agent_description(self, agent_name: str) -> str:
         """Retorna descripción de un agente."""
-        descriptions = {
-            "simple_processor": "Procesador general para contenido educativo lineal. Ideal para conferencias, clases y presentaciones.",
-            "meeting_processor": "Procesador especializado para reuniones diarizadas. Extrae decisiones, action items y participantes."
-        }
-        return descriptions.get(agent_name, "Agente no encontrado")
+        return AGENT_DESCRIPTIONS.get(agent_name, "Agente no encontrado")
     
-    async def save_temp_file(self, content: bytes, suffix: str = ".tmp") -> str:
-        """Guarda contenido en un archivo temporal y retorna la ruta."""
+    def save_temp_file_stream(self, file_obj: BinaryIO, suffix: str = ".tmp") -> str:
+        """Copia un objeto tipo archivo a un temporal por bloques, sin materializarlo en bytes."""
+        file_obj.seek(0)
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            tmp_file.write(content)
+            shutil.copyfileobj(file_obj, tmp_file, length=1 << 20)
             return tmp_file.name
     
+    async def save_temp_files(self, files: List[Any]) -> List[str]:
+        """Guarda varios archivos subidos en temporales de forma concurrente."""
+        outcomes = await asyncio.gather(*(
+            asyncio.to_thread(self.save_temp_file_stream, file, Path(file.name).suffix)
+            for file in files
+        ), return_exceptions=True)
+        
+        errors = [o for o in outcomes if isinstance(o, BaseException)]
+        if errors:
+            # No dejar temporales huérfanos si alguna copia falló
+            for path in outcomes:
+                if not isinstance(path, BaseException):
+                    Path(path).unlink(missing_ok=True)
+            raise errors[0]
+        
+        return list(outcomes)
+    
     def cleanup_temp_files(self, file_paths: List[str]):
         """Limpia archivos temporales."""
+        failed = []
         for file_path in file_paths:
             try:
-                if os.path.exists(file_path):
-                    os.unlink(file_path)
+                Path(file_path).unlink(missing_ok=True)
             except Exception as e:
-                st.warning(f"No se pudo eliminar archivo temporal {file_path}: {e}")
+                failed.append(f"{file_path}: {e}")
+        
+        # Un único aviso para todos los fallos
+        if failed:
+            st.warning("No se pudieron eliminar archivos temporales:\n" + "\n".join(failed))
 
 # Helper functions para Streamlit
+
+# Un event loop persistente por hilo: se crea una vez y se reutiliza
+_THREAD_LOOPS = threading.local()
+
+def _thread_loop() -> asyncio.AbstractEventLoop:
+    """Retorna el event loop del hilo actual, creándolo la primera vez."""
+    loop = getattr(_THREAD_LOOPS, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _THREAD_LOOPS.loop = loop
+    return loop
+
+def _session_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """
+    Hilo dedicado a las coroutines de la sesión actual.
+
+    Cada sesión tiene el suyo: un procesamiento largo de una sesión nunca
+    deja en cola las llamadas de otra. Las llamadas de una misma sesión ya
+    son secuenciales (el script espera el resultado), así que basta un hilo,
+    que conserva su event loop entre llamadas. Cuando la sesión se libera,
+    el executor se recolecta y su hilo termina.
+    """
+    executor = st.session_state.get('_async_executor')
+    if executor is None:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="streamlit-async"
+        )
+        st.session_state['_async_executor'] = executor
+    return executor
+
 def run_async_in_streamlit(coroutine):
     """Ejecuta una coroutine asíncrona en Streamlit de forma simple."""
-    import concurrent.futures
-    import threading
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    # Propagar el contexto de Streamlit para que los callbacks puedan pintar
+    ctx = get_script_run_ctx()
 
     def run_in_thread():
-        # Crear un nuevo event loop para este hilo
-        new_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(new_loop)
-        try:
-            return new_loop.run_until_complete(coroutine)
-        finally:
-            new_loop.close()
-            asyncio.set_event_loop(None)
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return _thread_loop().run_until_complete(coroutine)
+
+    # Fuera de una sesión (scripts, tests) no hay dónde guardar el hilo: uno por
+    # llamada, y asyncio.run cierra su loop al terminar
+    if ctx is None:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
 
-    # Siempre ejecutar en un hilo separado para evitar conflictos
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        future = executor.submit(run_in_thread)
-        return future.result()
+    # Siempre ejecutar en un hilo separado (el de la sesión) para evitar conflictos
+    return _session_executor().submit(run_in_thread).result()
 
 def create_progress_callback():
     """Crea un callback de progreso para Streamlit."""
     progress_bar = st.progress(0)
     status_text = st.empty()
+    last_emit = [0.0]
+    # Última actualización suprimida y si ya hay un envío diferido programado
+    pending = [None]
+    flush_scheduled = [False]
 
-    def callback(message: str, progress: float):
+    def emit(message: str, progress: float):
         progress_bar.progress(progress)
         status_text.text(message)
+        last_emit[0] = time.monotonic()
+        pending[0] = None
+
+    def flush():
+        flush_scheduled[0] = False
+        if pending[0] is not None:
+            emit(*pending[0])
+
+    def callback(message: str, progress: float):
+        # Agrupar actualizaciones muy seguidas; la final (1.0) siempre se envía
+        elapsed = time.monotonic() - last_emit[0]
+        if progress >= 1.0 or elapsed > PROGRESS_MIN_INTERVAL:
+            emit(message, progress)
+            return
+
+        # La suprimida no se pierde: se envía al cumplirse el intervalo, aunque
+        # no llegue otra actualización (p. ej. durante una llamada larga al LLM)
+        pending[0] = (message, progress)
+        if not flush_scheduled[0]:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # sin loop: se enviará con la siguiente actualización
+            flush_scheduled[0] = True
+            loop.call_later(PROGRESS_MIN_INTERVAL - elapsed, flush)
+
+    return callback
+
+def create_segment_callback():
+    """Crea un callback que muestra cada segmento en cuanto se procesa."""
+    container = st.container()
+
+    def callback(segment: Dict[str, Any]):
+        status = "❌" if segment.get('error') else "✅"
+        with container.expander(f"{status} Segmento {segment['segment_number']}"):
+            st.markdown(segment['processed_content'])
 
-    return callback
\ No newline at end of file
+    return callback
@@ -6,11 +6,68 @@ Gestiona la configuración de FastAgent de forma centralizada,
 incluyendo proveedores LLM, agentes y parámetros del sistema.
 """
 
+import copy
+import threading
 import yaml
 import streamlit as st
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import json
+import hashlib
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+# Proveedores LLM reconocidos en el archivo de configuración
+PROVIDER_KEYS = ('azure', 'generic', 'openai', 'anthropic', 'google')
+
+# Proveedores que el Dashboard lista como activos
+DASHBOARD_PROVIDERS = ('azure', 'generic', 'openai', 'anthropic')
+
+
+class RateLimitingConfig(BaseModel):
+    """Parámetros de rate limiting, validados una vez al cargarlos."""
+    # extra='allow' conserva claves adicionales (p. ej. max_retries del CLI)
+    model_config = ConfigDict(frozen=True, extra='allow')
+
+    max_tokens_per_request: int = 50000
+    requests_per_minute: int = 3
+    backoff_factor: float = 3.0
+    max_backoff: int = 600
+    delay_between_requests: int = 30
+    max_concurrent_segments: int = 4
+
+
+# Instrucciones de los agentes tal como están definidas en el código
+AGENT_INSTRUCTIONS = {
+    'punctuator': """Add proper punctuation and capitalization to speech-to-text content while preserving 100% of the original words.
+
+RULES:
+- Add punctuation marks (periods, commas, question marks, exclamation points)
+- Capitalize proper nouns and sentence beginnings  
+- DO NOT remove, change, or rephrase any words
+- DO NOT eliminate filler words like "eh", "bueno", "entonces" 
+- Keep ALL content exactly as provided, just add punctuation""",
+
+    'simple_processor': """You are an educational content processor that transforms speech-to-text transcriptions into professional educational documents.
+
+TASK: Process each content segment through these steps:
+1. PUNCTUATION: Add proper punctuation and capitalization
+2. TITLE: Create a descriptive title for this segment
+3. FORMATTING: Structure content with appropriate headings and paragraphs
+4. Q&A: Generate 3-5 educational questions with detailed answers
+
+PRESERVE: 100% of original content, no elimination or paraphrasing""",
+
+    'meeting_processor': """You are a meeting content processor specialized in extracting actionable insights from diarized meetings.
+
+TASK: Process meeting segments to extract:
+1. DECISIONS: What decisions were made and by whom
+2. ACTION ITEMS: Tasks assigned with responsible parties and deadlines
+3. UNRESOLVED QUESTIONS: Issues that need follow-up
+4. TECHNICAL DISCUSSIONS: Key technical points by participant
+
+FORMAT: Create structured output with clear sections for decisions, actions, and Q&A."""
+}
+
 
 class ConfigManager:
     """Gestor centralizado de configuración para FastAgent."""
@@ -21,10 +78,39 @@ class ConfigManager:
         self.config_path = project_root / "fastagent.config.yaml"
         self.example_config_path = project_root / "fastagent.config.yaml.example"
         self._config = None
+        self._validation_cache = None
+        self._config_hash = None
+        self._rate_limiting = None
+        # La instancia se comparte entre sesiones: los cambios y memos van bajo lock
+        self._lock = threading.RLock()
+        self._config_mtime = None
         self._load_config()
     
+    def _file_mtime(self) -> Optional[int]:
+        """mtime del archivo de configuración, o None si no existe."""
+        try:
+            return self.config_path.stat().st_mtime_ns
+        except OSError:
+            return None
+    
+    def reload_if_changed(self):
+        """Recarga el archivo si se ha modificado fuera de esta instancia."""
+        if self._file_mtime() == self._config_mtime:
+            return
+        with self._lock:
+            if self._file_mtime() != self._config_mtime:
+                self._load_config()
+                self._clear_memos()
+    
+    def _clear_memos(self):
+        """Invalida la validación, el hash y el rate limiting memoizados."""
+        self._validation_cache = None
+        self._config_hash = None
+        self._rate_limiting = None
+    
     def _load_config(self):
         """Carga la configuración desde el archivo."""
+        self._config_mtime = self._file_mtime()
         try:
             if self.config_path.exists():
                 with open(self.config_path, 'r', encoding='utf-8') as f:
@@ -86,14 +172,26 @@ class ConfigManager:
             }
         }
     
+    def config_hash(self) -> str:
+        """Retorna un hash estable de la configuración actual."""
+        with self._lock:
+            if self._config_hash is None:
+                serialized = json.dumps(self._config, sort_keys=True, default=str)
+                self._config_hash = hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+            return self._config_hash
+    
     def get_config(self) -> Dict[str, Any]:
-        """Retorna la configuración actual."""
-        return self._config.copy()
+        """Retorna una copia independiente de la configuración actual."""
+        return copy.deepcopy(self._config)
     
     def update_config(self, updates: Dict[str, Any]):
         """Actualiza la configuración con nuevos valores."""
-        self._deep_update(self._config, updates)
-        self._save_config()
+        with self._lock:
+            # Copia al escribir: quien esté leyendo la configuración anterior no la ve cambiar
+            config = copy.deepcopy(self._config)
+            self._deep_update(config, updates)
+            self._config = config
+            self._save_config()
     
     def _deep_update(self, base_dict: Dict, update_dict: Dict):
         """Actualiza recursivamente diccionarios anidados."""
@@ -105,21 +203,27 @@ class ConfigManager:
     
     def _save_config(self):
         """Guarda la configuración al archivo."""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self._config, f, default_flow_style=False, allow_unicode=True)
-            st.success("✅ Configuración guardada correctamente")
-        except Exception as e:
-            st.error(f"❌ Error guardando configuración: {e}")
+        with self._lock:
+            # Cualquier guardado invalida la validación y el hash memoizados
+            self._clear_memos()
+            try:
+                with open(self.config_path, 'w', encoding='utf-8') as f:
+                    yaml.dump(self._config, f, default_flow_style=False, allow_unicode=True)
+                # El guardado propio no debe provocar una recarga
+                self._config_mtime = self._file_mtime()
+                st.success("✅ Configuración guardada correctamente")
+            except Exception as e:
+                st.error(f"❌ Error guardando configuración: {e}")
     
     def get_provider_config(self, provider: str) -> Dict[str, Any]:
-        """Retorna configuración de un proveedor específico."""
-        return self._config.get(provider, {})
+        """Retorna una copia de la configuración de un proveedor específico."""
+        return copy.deepcopy(self._config.get(provider, {}))
     
     def update_provider_config(self, provider: str, config: Dict[str, Any]):
         """Actualiza configuración de un proveedor específico."""
-        self._config[provider] = config
-        self._save_config()
+        with self._lock:
+            self._config = {**self._config, provider: copy.deepcopy(config)}
+            self._save_config()
     
     def get_available_providers(self) -> list:
         """Retorna lista de proveedores configurados."""
@@ -134,12 +238,23 @@ class ConfigManager:
     
     def is_provider_configured(self, provider: str) -> bool:
         """Verifica si un proveedor está correctamente configurado."""
-        config = self.get_provider_config(provider)
-        
+        return self._is_provider_config_valid(provider, self._config.get(provider, {}))
+    
+    def get_configured_providers(self) -> set:
+        """Retorna el conjunto de proveedores configurados en una sola pasada."""
+        return {
+            provider for provider, config in self._config.items()
+            if provider in PROVIDER_KEYS and isinstance(config, dict)
+            and self._is_provider_config_valid(provider, config)
+        }
+    
+    @staticmethod
+    def _is_provider_config_valid(provider: str, config: Dict[str, Any]) -> bool:
+        """Predicado de configuración válida para un proveedor."""
         if provider == 'azure':
-            return (config.get('api_key') and 
-                   config.get('api_key') != 'YOUR_AZURE_API_KEY_HERE' and
-                   config.get('base_url'))
+            return bool(config.get('api_key') and 
+                        config.get('api_key') != 'YOUR_AZURE_API_KEY_HERE' and
+                        config.get('base_url'))
         
         elif provider == 'generic':  # Ollama
             return config.get('base_url') is not None
@@ -155,54 +270,44 @@ class ConfigManager:
     
     def set_default_model(self, model: str):
         """Establece el modelo por defecto."""
-        self._config['default_model'] = model
-        self._save_config()
+        with self._lock:
+            self._config = {**self._config, 'default_model': model}
+            self._save_config()
     
-    def get_rate_limiting_config(self) -> Dict[str, Any]:
-        """Retorna configuración de rate limiting."""
-        return self._config.get('rate_limiting', {})
+    def get_rate_limiting_config(self) -> RateLimitingConfig:
+        """Retorna configuración de rate limiting (validada y memoizada)."""
+        with self._lock:
+            if self._rate_limiting is None:
+                try:
+                    self._rate_limiting = RateLimitingConfig.model_validate(
+                        self._config.get('rate_limiting') or {}
+                    )
+                except ValidationError as e:
+                    st.error(f"Error en la configuración de rate limiting: {e}")
+                    self._rate_limiting = RateLimitingConfig()
+            return self._rate_limiting
     
     def update_rate_limiting_config(self, config: Dict[str, Any]):
         """Actualiza configuración de rate limiting."""
-        self._config['rate_limiting'] = config
-        self._save_config()
+        rate_limiting = RateLimitingConfig.model_validate(config).model_dump()
+        with self._lock:
+            self._config = {**self._config, 'rate_limiting': rate_limiting}
+            self._save_config()
     
     def get_agent_instructions(self) -> Dict[str, str]:
         """Retorna las instrucciones de los agentes desde el código."""
-        # Estas instrucciones se pueden extraer del código o mantener aquí
-        return {
-            'punctuator': """Add proper punctuation and capitalization to speech-to-text content while preserving 100% of the original words.
-
-RULES:
-- Add punctuation marks (periods, commas, question marks, exclamation points)
-- Capitalize proper nouns and sentence beginnings  
-- DO NOT remove, change, or rephrase any words
-- DO NOT eliminate filler words like "eh", "bueno", "entonces" 
-- Keep ALL content exactly as provided, just add punctuation""",
-            
-            'simple_processor': """You are an educational content processor that transforms speech-to-text transcriptions into professional educational documents.
-
-TASK: Process each content segment through these steps:
-1. PUNCTUATION: Add proper punctuation and capitalization
-2. TITLE: Create a descriptive title for this segment
-3. FORMATTING: Structure content with appropriate headings and paragraphs
-4. Q&A: Generate 3-5 educational questions with detailed answers
-
-PRESERVE: 100% of original content, no elimination or paraphrasing""",
-            
-            'meeting_processor': """You are a meeting content processor specialized in extracting actionable insights from diarized meetings.
-
-TASK: Process meeting segments to extract:
-1. DECISIONS: What decisions were made and by whom
-2. ACTION ITEMS: Tasks assigned with responsible parties and deadlines
-3. UNRESOLVED QUESTIONS: Issues that need follow-up
-4. TECHNICAL DISCUSSIONS: Key technical points by participant
-
-FORMAT: Create structured output with clear sections for decisions, actions, and Q&A."""
-        }
+        # Constante de módulo: no se reconstruye en cada rerun
+        return dict(AGENT_INSTRUCTIONS)
     
     def validate_config(self) -> Dict[str, bool]:
-        """Valida la configuración actual."""
+        """Valida la configuración actual (memoizada hasta el próximo guardado)."""
+        with self._lock:
+            if self._validation_cache is None:
+                self._validation_cache = self._compute_validation()
+            return dict(self._validation_cache)
+
+    def _compute_validation(self) -> Dict[str, bool]:
+        """Recorre la configuración y calcula el estado de validación."""
         validation = {
             'has_provider': False,
             'valid_model': False,
@@ -210,10 +315,7 @@ FORMAT: Create structured output with clear sections for decisions, actions, and
         }
         
         # Verificar si hay al menos un proveedor configurado
-        for provider in ['azure', 'generic', 'openai', 'anthropic', 'google']:
-            if self.is_provider_configured(provider):
-                validation['has_provider'] = True
-                break
+        validation['has_provider'] = bool(self.get_configured_providers())
         
         # Verificar modelo por defecto
         default_model = self.get_default_model()
@@ -222,10 +324,11 @@ FORMAT: Create structured output with clear sections for decisions, actions, and
         
         # Verificar rate limiting
         rate_config = self.get_rate_limiting_config()
-        if (rate_config.get('requests_per_minute', 0) > 0 and
-            rate_config.get('delay_between_requests', 0) > 0):
+        if rate_config.requests_per_minute > 0 and rate_config.delay_between_requests > 0:
             validation['rate_limiting_ok'] = True
         
+        # Estado global precalculado para que los consumidores no recorran el dict
+        validation['all_ok'] = all(validation.values())
         return validation
     
     def export_config_json(self) -> str:
@@ -234,5 +337,60 @@ FORMAT: Create structured output with clear sections for decisions, actions, and
     
     def reset_to_defaults(self):
         """Resetea la configuración a valores por defecto."""
-        self._config = self._get_default_config()
-        self._save_config()
\ No newline at end of file
+        with self._lock:
+            self._config = self._get_default_config()
+            self._save_config()
+
+
+@st.cache_resource
+def _shared_config_manager() -> ConfigManager:
+    """Instancia única por proceso, compartida por todas las sesiones."""
+    return ConfigManager()
+
+
+def get_config_manager() -> ConfigManager:
+    """
+    Retorna el ConfigManager compartido por todas las sesiones.
+
+    Los métodos de actualización modifican esta misma instancia, así que las
+    demás sesiones ven los cambios en su siguiente rerun. Si el archivo se
+    edita fuera de la UI, se recarga al detectar el cambio de mtime.
+    """
+    config_manager = _shared_config_manager()
+    config_manager.reload_if_changed()
+    return config_manager
+
+
+@st.cache_data(ttl=60)
+def _validate(config_hash: str, _cm: ConfigManager) -> Dict[str, bool]:
+    """Validación cacheada por hash de configuración."""
+    return _cm.validate_config()
+
+
+@st.cache_data(ttl=60)
+def _providers_configured(config_hash: str, _cm: ConfigManager) -> Dict[str, bool]:
+    """Estado de cada proveedor cacheado por hash de configuración."""
+    configured = _cm.get_configured_providers()
+    return {provider: provider in configured for provider in PROVIDER_KEYS}
+
+
+@st.cache_data(ttl=60)
+def _active_providers(config_hash: str, _cm: ConfigManager) -> Tuple[str, ...]:
+    """Nombres de los proveedores configurados, en orden de DASHBOARD_PROVIDERS."""
+    configured = _cm.get_configured_providers()
+    return tuple(p.title() for p in DASHBOARD_PROVIDERS if p in configured)
+
+
+def cached_validation(config_manager: ConfigManager) -> Dict[str, bool]:
+    """Retorna validate_config() reutilizando el resultado entre reruns."""
+    return _validate(config_manager.config_hash(), config_manager)
+
+
+def cached_provider_status(config_manager: ConfigManager) -> Dict[str, bool]:
+    """Retorna {proveedor: configurado} reutilizando el resultado entre reruns."""
+    return _providers_configured(config_manager.config_hash(), config_manager)
+
+
+def cached_active_providers(config_manager: ConfigManager) -> Tuple[str, ...]:
+    """Retorna los nombres de proveedores activos reutilizando el resultado entre reruns."""
+    return _active_providers(config_manager.config_hash(), config_manager)
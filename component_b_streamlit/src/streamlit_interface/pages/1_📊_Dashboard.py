@@ -7,35 +7,43 @@ Panel de control principal con métricas y estado del sistema.
 """
 
 import streamlit as st
-import sys
-from pathlib import Path
 
-# Añadir el directorio padre al path
-parent_dir = Path(__file__).parent.parent.parent.parent
-sys.path.append(str(parent_dir))
+# Añadir la raíz del proyecto al path (una sola vez por proceso)
+import _paths  # noqa: F401
 
-from src.streamlit_interface.core.config_manager import ConfigManager
+from src.streamlit_interface.core.config_manager import (
+    get_config_manager, cached_validation, cached_active_providers
+)
 from src.streamlit_interface.components.ui_components import (
-    setup_page_config, show_sidebar, show_config_status
+    setup_page_config, show_sidebar
 )
 
+# Información estática de agentes (no depende de la configuración)
+_AGENTS_INFO = {
+    "Disponibles": "simple_processor, meeting_processor",
+    "Por defecto": "Auto-detección",
+    "Q&A": "Habilitado",
+    "Multimodal": "Soportado"
+}
+
 def main():
     """Dashboard principal."""
 
     setup_page_config()
 
-    # Inicializar config manager
-    if 'config_manager' not in st.session_state:
-        st.session_state.config_manager = ConfigManager()
-
-    config_manager = st.session_state.config_manager
+    # Config manager compartido entre sesiones
+    config_manager = get_config_manager()
 
     show_sidebar()
 
     st.title("📊 Dashboard FastAgent")
 
+    # Validar una sola vez por rerun y pasar el resultado a cada panel
+    validation = cached_validation(config_manager)
+    providers = cached_active_providers(config_manager)
+
     # Estado general del sistema
-    show_system_status(config_manager)
+    show_system_status(config_manager, validation, providers)
 
     st.markdown("---")
 
@@ -46,15 +54,14 @@ def main():
         show_system_info(config_manager)
 
     with col2:
-        show_quick_actions(config_manager)
+        show_quick_actions(config_manager, validation)
 
-def show_system_status(config_manager):
+@st.fragment
+def show_system_status(config_manager, validation, providers):
     """Muestra el estado general del sistema."""
 
     st.subheader("🔧 Estado del Sistema")
 
-    validation = config_manager.validate_config()
-
     # Indicadores de estado
     col1, col2, col3, col4 = st.columns(4)
 
@@ -77,18 +84,13 @@ def show_system_status(config_manager):
             st.warning("⚠️ Rate Limiting")
 
     with col4:
-        overall_status = all(validation.values())
+        overall_status = validation['all_ok']
         if overall_status:
             st.success("✅ Sistema Listo")
         else:
             st.error("❌ Configuración Incompleta")
 
     # Proveedores configurados
-    providers = []
-    for provider in ['azure', 'generic', 'openai', 'anthropic']:
-        if config_manager.is_provider_configured(provider):
-            providers.append(provider.title())
-
     if providers:
         st.info(f"🔗 **Proveedores activos**: {', '.join(providers)}")
     else:
@@ -99,6 +101,7 @@ def show_system_status(config_manager):
     st.info(f"🎯 **Modelo por defecto**: `{default_model}`")
 
 
+@st.fragment
 def show_system_info(config_manager):
     """Muestra información del sistema."""
 
@@ -110,17 +113,12 @@ def show_system_info(config_manager):
     # Información de configuración
     info_data = {
         "🔧 Configuración": {
-            "Requests/min": rate_config.get('requests_per_minute', 'No configurado'),
-            "Delay entre requests": f"{rate_config.get('delay_between_requests', 0)}s",
-            "Max tokens/request": f"{rate_config.get('max_tokens_per_request', 0):,}",
-            "Factor de backoff": rate_config.get('backoff_factor', 'No configurado')
+            "Requests/min": rate_config.requests_per_minute,
+            "Delay entre requests": f"{rate_config.delay_between_requests}s",
+            "Max tokens/request": f"{rate_config.max_tokens_per_request:,}",
+            "Factor de backoff": rate_config.backoff_factor
         },
-        "🎯 Agentes": {
-            "Disponibles": "simple_processor, meeting_processor",
-            "Por defecto": "Auto-detección",
-            "Q&A": "Habilitado",
-            "Multimodal": "Soportado"
-        }
+        "🎯 Agentes": _AGENTS_INFO
     }
 
     for category, items in info_data.items():
@@ -141,14 +139,14 @@ def show_system_info(config_manager):
         st.info("No hay servidores MCP configurados")
 
 
-def show_quick_actions(config_manager):
+@st.fragment
+def show_quick_actions(config_manager, validation):
     """Muestra acciones rápidas."""
 
     st.subheader("⚡ Acciones Rápidas")
 
     # Verificar estado para habilitar/deshabilitar acciones
-    validation = config_manager.validate_config()
-    is_ready = all(validation.values())
+    is_ready = validation['all_ok']
 
     # Acción: Ir a procesamiento
     if st.button("📝 Procesar Contenido", use_container_width=True, disabled=not is_ready):
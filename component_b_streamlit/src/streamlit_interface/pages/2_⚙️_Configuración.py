@@ -7,29 +7,27 @@ Configuración de proveedores LLM y parámetros del sistema.
 """
 
 import streamlit as st
-import sys
-from pathlib import Path
+from typing import Tuple
 
-# Añadir el directorio padre al path
-parent_dir = Path(__file__).parent.parent.parent.parent
-sys.path.append(str(parent_dir))
+# Añadir la raíz del proyecto al path (una sola vez por proceso)
+import _paths  # noqa: F401
 
-from src.streamlit_interface.core.config_manager import ConfigManager
+from src.streamlit_interface.core.config_manager import (
+    get_config_manager, cached_validation, cached_provider_status
+)
 from src.streamlit_interface.components.ui_components import (
     setup_page_config, show_sidebar, show_provider_form,
     show_config_status
 )
+from src.streamlit_interface.utils.validation import validate_rate_limiting_config
 
 def main():
     """Página principal de configuración."""
 
     setup_page_config()
 
-    # Inicializar config manager
-    if 'config_manager' not in st.session_state:
-        st.session_state.config_manager = ConfigManager()
-
-    config_manager = st.session_state.config_manager
+    # Config manager compartido entre sesiones
+    config_manager = get_config_manager()
 
     show_sidebar()
 
@@ -175,6 +173,25 @@ def show_provider_info(provider: str):
             - opus (máxima calidad)
             """)
 
+# Modelos ofrecidos por cada proveedor, en orden de presentación
+_PROVIDER_MODELS = {
+    'azure': ("azure.gpt-4.1", "azure.gpt-4o", "azure.gpt-4"),
+    'generic': ("generic.llama3.1", "generic.mistral", "generic.codellama"),
+    'openai': ("gpt-4o", "gpt-4", "o1-mini", "o3-mini"),
+    'anthropic': ("haiku", "sonnet", "opus"),
+}
+
+@st.cache_data(ttl=60)
+def _model_options(config_hash: str, _cm) -> Tuple[str, ...]:
+    """Modelos disponibles según los proveedores configurados, por hash de configuración."""
+    provider_status = cached_provider_status(_cm)
+    return tuple(
+        model
+        for provider, models in _PROVIDER_MODELS.items()
+        if provider_status[provider]
+        for model in models
+    )
+
 def show_default_model_config(config_manager):
     """Configuración del modelo por defecto."""
 
@@ -185,36 +202,7 @@ def show_default_model_config(config_manager):
     st.info(f"🎯 **Modelo actual**: `{current_model}`")
 
     # Opciones de modelo según proveedores configurados
-    model_options = []
-
-    if config_manager.is_provider_configured('azure'):
-        model_options.extend([
-            "azure.gpt-4.1",
-            "azure.gpt-4o",
-            "azure.gpt-4"
-        ])
-
-    if config_manager.is_provider_configured('generic'):
-        model_options.extend([
-            "generic.llama3.1",
-            "generic.mistral",
-            "generic.codellama"
-        ])
-
-    if config_manager.is_provider_configured('openai'):
-        model_options.extend([
-            "gpt-4o",
-            "gpt-4",
-            "o1-mini",
-            "o3-mini"
-        ])
-
-    if config_manager.is_provider_configured('anthropic'):
-        model_options.extend([
-            "haiku",
-            "sonnet",
-            "opus"
-        ])
+    model_options = list(_model_options(config_manager.config_hash(), config_manager))
 
     if not model_options:
         st.warning("⚠️ No hay proveedores configurados. Configura al menos uno en la pestaña 'Proveedores LLM'.")
@@ -273,7 +261,7 @@ def show_rate_limiting_config(config_manager):
         with col1:
             max_tokens = st.number_input(
                 "Max Tokens por Request",
-                value=current_config.get('max_tokens_per_request', 50000),
+                value=current_config.max_tokens_per_request,
                 min_value=1000,
                 max_value=100000,
                 step=1000,
@@ -282,7 +270,7 @@ def show_rate_limiting_config(config_manager):
 
             requests_per_minute = st.number_input(
                 "Requests por Minuto",
-                value=current_config.get('requests_per_minute', 3),
+                value=current_config.requests_per_minute,
                 min_value=1,
                 max_value=60,
                 help="Máximo número de requests por minuto"
@@ -291,7 +279,7 @@ def show_rate_limiting_config(config_manager):
         with col2:
             backoff_factor = st.number_input(
                 "Factor de Backoff",
-                value=current_config.get('backoff_factor', 3.0),
+                value=current_config.backoff_factor,
                 min_value=1.0,
                 max_value=10.0,
                 step=0.5,
@@ -300,20 +288,28 @@ def show_rate_limiting_config(config_manager):
 
             delay_between_requests = st.number_input(
                 "Delay entre Requests (segundos)",
-                value=current_config.get('delay_between_requests', 30),
+                value=current_config.delay_between_requests,
                 min_value=5,
                 max_value=300,
-                help="Tiempo de espera entre requests consecutivos"
+                help="Tiempo de espera entre requests consecutivos una vez recibido un error 429"
             )
 
         max_backoff = st.number_input(
             "Máximo Backoff (segundos)",
-            value=current_config.get('max_backoff', 600),
+            value=current_config.max_backoff,
             min_value=60,
             max_value=1800,
             help="Tiempo máximo de espera en reintentos"
         )
 
+        max_concurrent_segments = st.number_input(
+            "Segmentos en paralelo",
+            value=current_config.max_concurrent_segments,
+            min_value=1,
+            max_value=16,
+            help="Llamadas simultáneas al LLM durante el procesamiento (nunca más que los requests por minuto)"
+        )
+
         # Presets comunes
         st.subheader("Presets Comunes")
 
@@ -351,11 +347,16 @@ def show_rate_limiting_config(config_manager):
                 'requests_per_minute': requests_per_minute,
                 'backoff_factor': backoff_factor,
                 'max_backoff': max_backoff,
-                'delay_between_requests': delay_between_requests
+                'delay_between_requests': delay_between_requests,
+                'max_concurrent_segments': max_concurrent_segments
             }
 
-            config_manager.update_rate_limiting_config(new_config)
-            st.success("✅ Configuración de rate limiting guardada")
+            is_valid, message = validate_rate_limiting_config(new_config)
+            if is_valid:
+                config_manager.update_rate_limiting_config(new_config)
+                st.success("✅ Configuración de rate limiting guardada")
+            else:
+                st.error(f"❌ {message}")
 
 def show_advanced_config(config_manager):
     """Configuración avanzada."""
@@ -389,15 +390,15 @@ def show_advanced_config(config_manager):
     st.subheader("📊 Información del Sistema")
 
     config = config_manager.get_config()
-    validation = config_manager.validate_config()
+    validation = cached_validation(config_manager)
+    provider_status = cached_provider_status(config_manager)
 
     col1, col2 = st.columns(2)
 
     with col1:
         st.metric(
             "Proveedores Configurados",
-            len([p for p in ['azure', 'generic', 'openai', 'anthropic']
-                if config_manager.is_provider_configured(p)])
+            sum(provider_status[p] for p in ['azure', 'generic', 'openai', 'anthropic'])
         )
 
         st.metric(
@@ -413,7 +414,7 @@ def show_advanced_config(config_manager):
 
         st.metric(
             "Configuración Válida",
-            "✅ Sí" if all(validation.values()) else "❌ No"
+            "✅ Sí" if validation['all_ok'] else "❌ No"
         )
 
     # Debug: mostrar configuración completa
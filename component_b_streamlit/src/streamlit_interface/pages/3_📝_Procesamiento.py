@@ -7,23 +7,24 @@ Página principal para procesar contenido STT con FastAgent.
 """
 
 import streamlit as st
-import sys
-from pathlib import Path
-import tempfile
 import os
+import re
+import hashlib
+from collections import namedtuple
+from typing import List, Tuple
 
-# Añadir el directorio padre al path
-parent_dir = Path(__file__).parent.parent.parent.parent
-sys.path.append(str(parent_dir))
+# Añadir la raíz del proyecto al path (una sola vez por proceso)
+import _paths  # noqa: F401
 
-from src.streamlit_interface.core.config_manager import ConfigManager
+from src.streamlit_interface.core.config_manager import get_config_manager
 from src.streamlit_interface.components.ui_components import (
     setup_page_config, show_sidebar, show_config_status,
     show_file_uploader, show_download_button, show_error_message,
-    show_expandable_content, show_metrics_cards
+    show_metrics_cards, Metric
 )
 from src.streamlit_interface.core.agent_interface import (
-    AgentInterface, run_async_in_streamlit, create_progress_callback
+    AgentInterface, run_async_in_streamlit, create_progress_callback,
+    create_segment_callback
 )
 
 def main():
@@ -32,13 +33,11 @@ def main():
     setup_page_config()
 
     # Inicializar componentes
-    if 'config_manager' not in st.session_state:
-        st.session_state.config_manager = ConfigManager()
+    config_manager = get_config_manager()
 
     if 'agent_interface' not in st.session_state:
-        st.session_state.agent_interface = AgentInterface(st.session_state.config_manager)
+        st.session_state.agent_interface = AgentInterface(config_manager)
 
-    config_manager = st.session_state.config_manager
     agent_interface = st.session_state.agent_interface
 
     show_sidebar()
@@ -67,114 +66,101 @@ def main():
     with tab3:
         show_results_tab()
 
+ContentStats = namedtuple('ContentStats', 'words chars segments')
+
+# Marcador de inicio de la sección de Q&A
+_QA_RE = re.compile(r'preguntas y respuestas|q&a', re.IGNORECASE)
+
+# Marcadores markdown eliminados en la descarga .txt
+_MD_STRIP = str.maketrans('', '', '#*')
+
+@st.cache_data(max_entries=8)
+def _content_stats(content: str) -> ContentStats:
+    """Calcula palabras, caracteres y segmentos estimados una vez por texto."""
+    words = len(content.split())
+    return ContentStats(words, len(content), max(1, words // 800))  # ~800 palabras por segmento
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def _segment_word_counts(segments: Tuple[Tuple[str, str], ...]) -> List[Tuple[int, int]]:
+    """Palabras (original, procesado) de cada segmento, calculadas una vez por resultado."""
+    return [(len(original.split()), len(processed.split())) for original, processed in segments]
+
+@st.cache_data(max_entries=4)
+def _to_plain(document: str) -> str:
+    """Convierte el documento markdown a texto plano en una sola pasada."""
+    return document.translate(_MD_STRIP)
+
+@st.cache_data(max_entries=8)
+def _decode_upload(file_id: str, name: str, size: int, _raw: bytes) -> str:
+    """Decodifica un archivo subido una sola vez por file_id."""
+    return _raw.decode('utf-8')
+
 def show_input_tab(config_manager, agent_interface):
     """Tab de input y configuración."""
 
     st.header("📤 Contenido a Procesar")
 
-    # Método de input
+    # Método de input (fuera del formulario: decide qué widgets se muestran)
     input_method = st.radio(
         "¿Cómo quieres proporcionar el contenido?",
         ["📝 Escribir texto", "📁 Subir archivo de texto"],
         horizontal=True
     )
 
-    content = ""
-
-    if input_method == "📝 Escribir texto":
-        content = st.text_area(
-            "Pega aquí tu transcripción STT:",
-            height=200,
-            placeholder="Ejemplo: bueno eh entonces vamos a hablar sobre inversiones..."
-        )
-
-    else:  # Subir archivo
-        uploaded_file = show_file_uploader(['txt'], max_size_mb=5)
-        if uploaded_file:
-            try:
-                content = uploaded_file.read().decode('utf-8')
-                st.success(f"✅ Archivo cargado: {len(content)} caracteres")
-
-                # Preview del contenido
-                with st.expander("👀 Preview del contenido"):
-                    st.text_area("Contenido:", content[:1000] + "..." if len(content) > 1000 else content, disabled=True)
-
-            except UnicodeDecodeError:
-                st.error("❌ Error: El archivo debe estar en formato UTF-8")
-                content = ""
-
-    # Guardar contenido en session state
-    if content:
-        st.session_state.input_content = content
-
-        # Estadísticas del contenido
-        word_count = len(content.split())
-        char_count = len(content)
-
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric("📝 Palabras", word_count)
-        with col2:
-            st.metric("🔤 Caracteres", char_count)
-        with col3:
-            estimated_segments = max(1, word_count // 800)  # ~800 palabras por segmento
-            st.metric("📊 Segmentos estimados", estimated_segments)
-
-    st.markdown("---")
-
-    # Documentos adicionales (multimodal)
-    st.subheader("📎 Documentos Adicionales (Opcional)")
-
-    st.info("💡 Puedes subir PDFs, imágenes u otros documentos para enriquecer el contexto del procesamiento.")
-
-    additional_files = st.file_uploader(
-        "Documentos adicionales:",
-        type=['pdf', 'png', 'jpg', 'jpeg', 'txt', 'md'],
-        accept_multiple_files=True
-    )
+    agent_options = {
+        "auto": "🔍 Auto-detección (Recomendado)",
+        "simple_processor": "📚 Procesador General",
+        "meeting_processor": "👥 Procesador de Reuniones"
+    }
+    available_agents = agent_interface.get_available_agents()
 
-    if additional_files:
-        st.session_state.additional_files = additional_files
+    # Un único formulario: los cambios en sus widgets no re-ejecutan la
+    # página hasta que se envía
+    with st.form("process_form", clear_on_submit=False):
+        uploaded_file = None
+        text_input = ""
+
+        if input_method == "📝 Escribir texto":
+            text_input = st.text_area(
+                "Pega aquí tu transcripción STT:",
+                height=200,
+                placeholder="Ejemplo: bueno eh entonces vamos a hablar sobre inversiones..."
+            )
 
-        for file in additional_files:
-            file_size_mb = len(file.getvalue()) / (1024 * 1024)
-            st.success(f"📎 **{file.name}** ({file_size_mb:.1f}MB)")
+        else:  # Subir archivo
+            uploaded_file = show_file_uploader(['txt'], max_size_mb=5)
 
-    st.markdown("---")
+        st.markdown("---")
 
-    # Configuración de procesamiento
-    st.subheader("⚙️ Configuración de Procesamiento")
+        # Documentos adicionales (multimodal)
+        st.subheader("📎 Documentos Adicionales (Opcional)")
 
-    # Selección de agente
-    available_agents = agent_interface.get_available_agents()
+        st.info("💡 Puedes subir PDFs, imágenes u otros documentos para enriquecer el contexto del procesamiento.")
 
-    agent_options = {
-        "auto": "🔍 Auto-detección (Recomendado)",
-        "simple_processor": "📚 Procesador General",
-        "meeting_processor": "👥 Procesador de Reuniones"
-    }
+        additional_files = st.file_uploader(
+            "Documentos adicionales:",
+            type=['pdf', 'png', 'jpg', 'jpeg', 'txt', 'md'],
+            accept_multiple_files=True
+        )
 
-    selected_agent = st.selectbox(
-        "Agente a utilizar:",
-        options=["auto"] + available_agents,
-        format_func=lambda x: agent_options.get(x, x),
-        help="Auto-detección analiza el contenido y selecciona el agente más apropiado"
-    )
+        st.markdown("---")
 
-    if selected_agent != "auto":
-        description = agent_interface.get_agent_description(selected_agent)
-        st.info(f"ℹ️ {description}")
+        # Configuración de procesamiento
+        st.subheader("⚙️ Configuración de Procesamiento")
 
-    st.session_state.selected_agent = selected_agent if selected_agent != "auto" else None
+        selected_agent = st.selectbox(
+            "Agente a utilizar:",
+            options=["auto"] + available_agents,
+            format_func=lambda x: agent_options.get(x, x),
+            help="Auto-detección analiza el contenido y selecciona el agente más apropiado"
+        )
 
-    # Configuración de Q&A
-    st.subheader("❓ Configuración de Q&A")
+        # Configuración de Q&A
+        st.subheader("❓ Configuración de Q&A")
 
-    enable_qa = st.checkbox("Generar preguntas y respuestas", value=True)
+        enable_qa = st.checkbox("Generar preguntas y respuestas", value=True)
 
-    if enable_qa:
-        qa_config = st.expander("🔧 Configuración avanzada de Q&A")
-        with qa_config:
+        with st.expander("🔧 Configuración avanzada de Q&A"):
             questions_per_segment = st.slider(
                 "Preguntas por segmento:",
                 min_value=2,
@@ -189,7 +175,62 @@ def show_input_tab(config_manager, agent_interface):
                 default=["Conceptos clave", "Ejemplos prácticos"]
             )
 
-    st.session_state.enable_qa = enable_qa
+        submitted = st.form_submit_button("💾 Guardar contenido y configuración", type="primary")
+
+    if submitted:
+        content = text_input
+
+        if uploaded_file:
+            try:
+                content = _decode_upload(
+                    uploaded_file.file_id, uploaded_file.name,
+                    uploaded_file.size, uploaded_file.getvalue()
+                )
+                st.success(f"✅ Archivo cargado: {len(content)} caracteres")
+
+            except UnicodeDecodeError:
+                st.error("❌ Error: El archivo debe estar en formato UTF-8")
+                content = ""
+
+        # Guardar contenido y configuración en session state
+        if content:
+            st.session_state.input_content = content
+            # El preview se recorta una sola vez, al guardar el contenido
+            st.session_state.input_preview = content[:1000] + "..." if len(content) > 1000 else content
+
+        if additional_files:
+            st.session_state.additional_files = additional_files
+
+        st.session_state.selected_agent = selected_agent if selected_agent != "auto" else None
+        st.session_state.enable_qa = enable_qa
+
+    # Resumen de lo guardado
+    content = st.session_state.get('input_content', "")
+
+    if content:
+        # Preview del contenido
+        with st.expander("👀 Preview del contenido"):
+            st.text_area("Contenido:", st.session_state.get('input_preview', content[:1000]), disabled=True)
+
+        # Estadísticas del contenido
+        stats = _content_stats(content)
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📝 Palabras", stats.words)
+        with col2:
+            st.metric("🔤 Caracteres", stats.chars)
+        with col3:
+            st.metric("📊 Segmentos estimados", stats.segments)
+
+    for file in st.session_state.get('additional_files') or []:
+        file_size_mb = file.size / (1024 * 1024)
+        st.success(f"📎 **{file.name}** ({file_size_mb:.1f}MB)")
+
+    saved_agent = st.session_state.get('selected_agent')
+    if saved_agent:
+        description = agent_interface.get_agent_description(saved_agent)
+        st.info(f"ℹ️ {description}")
 
     # Test de conexión
     st.markdown("---")
@@ -227,7 +268,10 @@ def show_processing_tab(agent_interface):
 
     # Verificar si hay contenido para procesar
     if 'input_content' not in st.session_state or not st.session_state.input_content.strip():
-        st.warning("⚠️ No hay contenido para procesar. Ve al tab **Input y Configuración**.")
+        st.warning(
+            "⚠️ No hay contenido para procesar. Ve al tab **Input y Configuración** "
+            "y pulsa **💾 Guardar contenido y configuración**."
+        )
         return
 
     content = st.session_state.input_content
@@ -238,7 +282,7 @@ def show_processing_tab(agent_interface):
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        word_count = len(content.split())
+        word_count = _content_stats(content).words
         st.metric("📝 Palabras", word_count)
 
     with col2:
@@ -255,55 +299,78 @@ def show_processing_tab(agent_interface):
 
     st.markdown("---")
 
+    # El formulario de input solo aplica sus cambios al guardarse
+    st.caption(
+        "ℹ️ Se procesa el último contenido guardado. Si cambiaste el texto, los "
+        "documentos o el agente, pulsa antes **💾 Guardar contenido y configuración**."
+    )
+
     # Botón de procesamiento
     if st.button("🚀 Iniciar Procesamiento", type="primary", use_container_width=True):
         process_content(agent_interface)
 
+def _processing_key(content: str, selected_agent, additional_files) -> str:
+    """Huella de una ejecución: contenido, agente y documentos adicionales."""
+    digest = hashlib.blake2b(content.encode('utf-8'), digest_size=16)
+    digest.update(str(selected_agent).encode('utf-8'))
+    for file in additional_files:
+        # file_id identifica cada subida sin tener que hashear sus bytes
+        digest.update(file.file_id.encode('utf-8'))
+    return digest.hexdigest()
+
 def process_content(agent_interface):
     """Ejecuta el procesamiento del contenido."""
 
     content = st.session_state.input_content
     selected_agent = st.session_state.get('selected_agent')
+    additional_files = st.session_state.get('additional_files') or []
 
-    # Preparar archivos adicionales
-    document_paths = []
-    temp_files = []
+    # Mismo contenido, agente y documentos que el último éxito: no repetir el pipeline
+    processing_key = _processing_key(content, selected_agent, additional_files)
+    previous = st.session_state.get('processing_result')
+    if st.session_state.get('processing_key') == processing_key and previous and previous.get('success'):
+        st.info("ℹ️ El contenido no ha cambiado desde el último procesamiento. Ve al tab **Resultados** para verlo.")
+        return
 
-    if 'additional_files' in st.session_state and st.session_state.additional_files:
-        for file in st.session_state.additional_files:
-            # Guardar archivo temporal
-            temp_path = run_async_in_streamlit(
-                agent_interface.save_temp_file(file.getvalue(), Path(file.name).suffix)
-            )
-            document_paths.append(temp_path)
-            temp_files.append(temp_path)
+    # Archivos temporales de los documentos adicionales
+    temp_files = []
 
     # Crear callback de progreso
     progress_callback = create_progress_callback()
+    segment_callback = create_segment_callback()
 
     try:
+        if additional_files:
+            # Guardar todos los archivos temporales en paralelo; si alguno
+            # falla, save_temp_files ya elimina los que se crearon
+            temp_files = run_async_in_streamlit(
+                agent_interface.save_temp_files(additional_files)
+            )
+
         # Ejecutar procesamiento
         result = run_async_in_streamlit(
             agent_interface.process_content(
                 content=content,
-                documents=document_paths if document_paths else None,
+                documents=temp_files or None,
                 progress_callback=progress_callback,
-                agent_override=selected_agent
+                agent_override=selected_agent,
+                segment_callback=segment_callback
             )
         )
 
         # Guardar resultado en session state
         st.session_state.processing_result = result
+        st.session_state.processing_key = processing_key
 
         if result['success']:
             st.success("🎉 **Procesamiento completado exitosamente!**")
 
             # Mostrar métricas
-            metrics = {
-                "Segmentos procesados": {"value": result['total_segments']},
-                "Agente utilizado": {"value": result['agent_used']},
-                "Reintentos": {"value": result['retry_count']}
-            }
+            metrics = (
+                Metric("Segmentos procesados", result['total_segments']),
+                Metric("Agente utilizado", result['agent_used']),
+                Metric("Reintentos", result['retry_count'])
+            )
 
             show_metrics_cards(metrics)
 
@@ -337,8 +404,9 @@ def process_content(agent_interface):
         if temp_files:
             agent_interface.cleanup_temp_files(temp_files)
 
+@st.fragment
 def show_results_tab():
-    """Tab de resultados."""
+    """Tab de resultados (fragmento: sus descargas no re-ejecutan la página)."""
 
     st.header("📥 Resultados del Procesamiento")
 
@@ -367,7 +435,7 @@ def show_results_tab():
         st.metric("🔄 Reintentos", result['retry_count'])
 
     with col4:
-        word_count = len(result['document'].split())
+        word_count = _content_stats(result['document']).words
         st.metric("📝 Palabras finales", word_count)
 
     st.markdown("---")
@@ -388,7 +456,7 @@ def show_results_tab():
         st.markdown(document)
 
     with view_tab2:
-        st.text_area("Documento completo:", document, height=400, disabled=True)
+        show_plain_view(document)
 
     with view_tab3:
         show_segments_view(result)
@@ -400,28 +468,28 @@ def show_results_tab():
 
     col1, col2, col3 = st.columns(3)
 
+    md_bytes, plain_bytes, qa_bytes = _download_payloads(result)
+
     with col1:
         show_download_button(
-            document,
+            md_bytes,
             "documento_procesado.md",
             "Descargar como Markdown"
         )
 
     with col2:
         # Versión sin markdown para .txt
-        plain_text = document.replace('#', '').replace('**', '').replace('*', '')
         show_download_button(
-            plain_text,
+            plain_bytes,
             "documento_procesado.txt",
             "Descargar como TXT"
         )
 
     with col3:
         # Solo la sección Q&A
-        qa_section = extract_qa_section(document)
-        if qa_section:
+        if qa_bytes:
             show_download_button(
-                qa_section,
+                qa_bytes,
                 "preguntas_respuestas.md",
                 "Solo Q&A"
             )
@@ -430,8 +498,32 @@ def show_results_tab():
     with st.expander("📊 Estadísticas Detalladas"):
         show_detailed_stats(result)
 
+def _download_payloads(result) -> Tuple[bytes, bytes, bytes]:
+    """Codifica las descargas (markdown, texto plano, Q&A) una vez por resultado."""
+    cached = st.session_state.get('_download_payloads')
+    if cached is None or cached[0] is not result:
+        document = result['document']
+        payloads = (
+            document.encode('utf-8'),
+            _to_plain(document).encode('utf-8'),
+            extract_qa_section(document).encode('utf-8')
+        )
+        # Se guarda el propio resultado para comparar por identidad
+        cached = (result, payloads)
+        st.session_state._download_payloads = cached
+    return cached[1]
+
+@st.fragment
+def show_plain_view(document: str):
+    """Vista de texto plano (fragmento: el toggle no re-renderiza las demás vistas)."""
+    # Las pestañas inactivas también se renderizan: el documento completo
+    # solo se envía al navegador cuando se pide
+    if st.toggle("Mostrar documento completo", key="show_plain"):
+        st.code(document, language=None)
+
+@st.fragment
 def show_segments_view(result):
-    """Muestra vista detallada por segmentos."""
+    """Muestra vista detallada por segmentos (fragmento: cambiar de segmento no re-renderiza el documento)."""
 
     segments = result.get('segments', [])
 
@@ -439,48 +531,56 @@ def show_segments_view(result):
         st.warning("No hay información detallada de segmentos disponible.")
         return
 
-    for i, segment in enumerate(segments):
-        with st.expander(f"Segmento {segment['segment_number']} {' ❌' if segment.get('error') else ''}"):
+    word_counts = _segment_word_counts(tuple(
+        (segment['original_content'], segment['processed_content']) for segment in segments
+    ))
 
-            if segment.get('error'):
-                st.error(f"Error: {segment['processed_content']}")
-            else:
-                # Contenido original
-                st.subheader("📝 Contenido Original")
-                st.text_area(
-                    f"Original {segment['segment_number']}:",
-                    segment['original_content'],
-                    height=100,
-                    disabled=True,
-                    key=f"orig_{i}"
-                )
+    # Solo se construyen los widgets del segmento seleccionado
+    if st.session_state.get('open_segment', 0) >= len(segments):
+        st.session_state.open_segment = 0  # resultado nuevo con menos segmentos
+
+    i = st.selectbox(
+        "Segmento:",
+        options=range(len(segments)),
+        format_func=lambda idx: f"Segmento {segments[idx]['segment_number']}{' ❌' if segments[idx].get('error') else ''}",
+        key="open_segment"
+    )
+    segment = segments[i]
+
+    if segment.get('error'):
+        st.error(f"Error: {segment['processed_content']}")
+    else:
+        # Contenido original
+        st.subheader("📝 Contenido Original")
+        st.text_area(
+            f"Original {segment['segment_number']}:",
+            segment['original_content'],
+            height=100,
+            disabled=True,
+            key=f"orig_{i}"
+        )
 
-                # Contenido procesado
-                st.subheader("✨ Contenido Procesado")
-                st.markdown(segment['processed_content'])
+        # Contenido procesado
+        st.subheader("✨ Contenido Procesado")
+        st.markdown(segment['processed_content'])
 
-                # Metadatos
-                st.subheader("🔧 Metadatos")
-                st.json({
-                    'agente_usado': segment['agent_used'],
-                    'palabras_originales': len(segment['original_content'].split()),
-                    'palabras_procesadas': len(segment['processed_content'].split())
-                })
+        # Metadatos
+        st.subheader("🔧 Metadatos")
+        st.json({
+            'agente_usado': segment['agent_used'],
+            'palabras_originales': word_counts[i][0],
+            'palabras_procesadas': word_counts[i][1]
+        })
 
+@st.cache_data(max_entries=16, show_spinner=False)
 def extract_qa_section(document: str) -> str:
     """Extrae solo la sección de Q&A del documento."""
-    lines = document.split('\n')
-    qa_section = []
-    in_qa = False
-
-    for line in lines:
-        if 'preguntas y respuestas' in line.lower() or 'q&a' in line.lower():
-            in_qa = True
-
-        if in_qa:
-            qa_section.append(line)
+    match = _QA_RE.search(document)
+    if not match:
+        return ""
 
-    return '\n'.join(qa_section) if qa_section else ""
+    # Desde el inicio de la línea que contiene el marcador hasta el final
+    return document[document.rfind('\n', 0, match.start()) + 1:]
 
 def show_detailed_stats(result):
     """Muestra estadísticas detalladas del procesamiento."""
@@ -489,8 +589,8 @@ def show_detailed_stats(result):
     final_document = result.get('document', '')
 
     # Métricas de transformación
-    original_words = len(original_content.split())
-    final_words = len(final_document.split())
+    original_words = _content_stats(original_content).words
+    final_words = _content_stats(final_document).words
     retention_rate = (final_words / original_words * 100) if original_words > 0 else 0
 
     col1, col2 = st.columns(2)
@@ -509,9 +609,7 @@ def show_detailed_stats(result):
     # Lista de archivos multimodales
     if multimodal_files:
         st.subheader("📎 Archivos Multimodales Utilizados")
-        for file_path in multimodal_files:
-            file_name = Path(file_path).name
-            st.text(f"• {file_name}")
+        st.text("\n".join(f"• {os.path.basename(file_path)}" for file_path in multimodal_files))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,28 +7,106 @@ Página para gestionar y personalizar agentes FastAgent.
 """
 
 import streamlit as st
-import sys
-from pathlib import Path
 
-# Añadir el directorio padre al path
-parent_dir = Path(__file__).parent.parent.parent.parent
-sys.path.append(str(parent_dir))
+# Añadir la raíz del proyecto al path (una sola vez por proceso)
+import _paths  # noqa: F401
 
-from src.streamlit_interface.core.config_manager import ConfigManager
+from src.streamlit_interface.core.config_manager import get_config_manager
 from src.streamlit_interface.components.ui_components import (
     setup_page_config, show_sidebar, show_expandable_content
 )
 
+# Información de agentes mostrada en la vista general
+_AGENTS_INFO = (
+    {
+        "name": "🔍 Auto-Detector",
+        "description": "Analiza el contenido automáticamente y selecciona el agente más apropiado",
+        "use_case": "Recomendado para la mayoría de casos",
+        "features": [
+            "Detecta reuniones diarizadas vs contenido lineal",
+            "Identifica participantes en reuniones",
+            "Analiza estructura del contenido",
+            "Selección inteligente de agente especializado"
+        ]
+    },
+    {
+        "name": "📚 Simple Processor",
+        "description": "Procesador general para contenido educativo lineal",
+        "use_case": "Conferencias, clases, presentaciones, podcasts",
+        "features": [
+            "Segmentación semántica inteligente",
+            "Generación de títulos descriptivos",
+            "Formateo profesional del contenido",
+            "Q&A educativo con referencias contextuales",
+            "Preservación del 85-95% del contenido original"
+        ]
+    },
+    {
+        "name": "👥 Meeting Processor",
+        "description": "Procesador especializado para reuniones diarizadas",
+        "use_case": "Reuniones de Teams, Zoom, Google Meet con speakers identificados",
+        "features": [
+            "Extracción de decisiones tomadas",
+            "Identificación de action items y responsables",
+            "Seguimiento de temas no resueltos",
+            "Resumen por participante principal",
+            "Timeline de conversaciones"
+        ]
+    }
+)
+
+# Tarjetas de la vista general ya formateadas: (título, caso de uso, características)
+_AGENT_CARDS = tuple(
+    (
+        f"{agent['name']} - {agent['description']}",
+        agent['use_case'],
+        "\n".join(f"- {feature}" for feature in agent['features'])
+    )
+    for agent in _AGENTS_INFO
+)
+
+# Diagrama y descripción del flujo de procesamiento (contenido estático)
+_OVERVIEW_MD = """
+    ```mermaid
+    graph TD
+        A[📝 Contenido Input] --> B[🔍 Content Format Detector]
+        B --> C{¿Formato Detectado?}
+        C -->|Reunión Diarizada| D[👥 Meeting Processor]
+        C -->|Contenido Lineal| E[📚 Simple Processor]
+        D --> F[📋 Meeting Output]
+        E --> G[📄 Educational Output]
+        F --> H[📥 Documento Final]
+        G --> H
+    ```
+
+    **Proceso detallado:**
+
+    1. **Análisis de Formato**: El sistema analiza automáticamente el contenido para detectar el tipo
+    2. **Segmentación**: Se divide el contenido en segmentos manejables (300-1000 palabras)
+    3. **Procesamiento**: Cada segmento se procesa con el agente especializado apropiado
+    4. **Q&A Generation**: Se generan preguntas y respuestas educativas para cada segmento
+    5. **Ensamblaje**: Se combina todo en un documento final estructurado
+"""
+
+# Etiquetas de los selectores de agente
+_PROMPT_LABELS = {
+    'punctuator': '🔤 Punctuator - Puntuación y capitalización',
+    'simple_processor': '📚 Simple Processor - Procesamiento general',
+    'meeting_processor': '👥 Meeting Processor - Procesamiento de reuniones'
+}
+
+_TEST_AGENT_LABELS = {
+    'simple_processor': '📚 Simple Processor',
+    'meeting_processor': '👥 Meeting Processor'
+}
+
 def main():
     """Página principal de gestión de agentes."""
 
     setup_page_config()
 
-    # Inicializar config manager
-    if 'config_manager' not in st.session_state:
-        st.session_state.config_manager = ConfigManager()
-
-    config_manager = st.session_state.config_manager
+    # Config manager compartido entre sesiones
+    config_manager = get_config_manager()
 
     show_sidebar()
 
@@ -61,84 +139,24 @@ def show_agents_overview():
 
     st.info("💡 FastAgent utiliza un sistema multi-agente especializado para diferentes tipos de contenido.")
 
-    # Información de agentes
-    agents_info = [
-        {
-            "name": "🔍 Auto-Detector",
-            "description": "Analiza el contenido automáticamente y selecciona el agente más apropiado",
-            "use_case": "Recomendado para la mayoría de casos",
-            "features": [
-                "Detecta reuniones diarizadas vs contenido lineal",
-                "Identifica participantes en reuniones",
-                "Analiza estructura del contenido",
-                "Selección inteligente de agente especializado"
-            ]
-        },
-        {
-            "name": "📚 Simple Processor",
-            "description": "Procesador general para contenido educativo lineal",
-            "use_case": "Conferencias, clases, presentaciones, podcasts",
-            "features": [
-                "Segmentación semántica inteligente",
-                "Generación de títulos descriptivos",
-                "Formateo profesional del contenido",
-                "Q&A educativo con referencias contextuales",
-                "Preservación del 85-95% del contenido original"
-            ]
-        },
-        {
-            "name": "👥 Meeting Processor",
-            "description": "Procesador especializado para reuniones diarizadas",
-            "use_case": "Reuniones de Teams, Zoom, Google Meet con speakers identificados",
-            "features": [
-                "Extracción de decisiones tomadas",
-                "Identificación de action items y responsables",
-                "Seguimiento de temas no resueltos",
-                "Resumen por participante principal",
-                "Timeline de conversaciones"
-            ]
-        }
-    ]
-
-    for agent in agents_info:
-        with st.expander(f"{agent['name']} - {agent['description']}"):
+    for label, use_case, features_md in _AGENT_CARDS:
+        with st.expander(label):
 
             col1, col2 = st.columns([1, 2])
 
             with col1:
                 st.subheader("📝 Caso de Uso")
-                st.write(agent['use_case'])
+                st.write(use_case)
 
             with col2:
                 st.subheader("✨ Características")
-                for feature in agent['features']:
-                    st.write(f"• {feature}")
+                st.markdown(features_md)
 
     # Flujo de procesamiento
     st.markdown("---")
     st.subheader("🔄 Flujo de Procesamiento")
 
-    st.markdown("""
-    ```mermaid
-    graph TD
-        A[📝 Contenido Input] --> B[🔍 Content Format Detector]
-        B --> C{¿Formato Detectado?}
-        C -->|Reunión Diarizada| D[👥 Meeting Processor]
-        C -->|Contenido Lineal| E[📚 Simple Processor]
-        D --> F[📋 Meeting Output]
-        E --> G[📄 Educational Output]
-        F --> H[📥 Documento Final]
-        G --> H
-    ```
-
-    **Proceso detallado:**
-
-    1. **Análisis de Formato**: El sistema analiza automáticamente el contenido para detectar el tipo
-    2. **Segmentación**: Se divide el contenido en segmentos manejables (300-1000 palabras)
-    3. **Procesamiento**: Cada segmento se procesa con el agente especializado apropiado
-    4. **Q&A Generation**: Se generan preguntas y respuestas educativas para cada segmento
-    5. **Ensamblaje**: Se combina todo en un documento final estructurado
-    """)
+    st.markdown(_OVERVIEW_MD)
 
 def show_prompts_editor(config_manager):
     """Editor de prompts de los agentes."""
@@ -157,54 +175,66 @@ def show_prompts_editor(config_manager):
     agent_to_edit = st.selectbox(
         "Selecciona el agente a editar:",
         options=list(current_instructions.keys()),
-        format_func=lambda x: {
-            'punctuator': '🔤 Punctuator - Puntuación y capitalización',
-            'simple_processor': '📚 Simple Processor - Procesamiento general',
-            'meeting_processor': '👥 Meeting Processor - Procesamiento de reuniones'
-        }.get(x, x)
+        format_func=lambda x: _PROMPT_LABELS.get(x, x)
     )
 
     if agent_to_edit:
         st.subheader(f"Editando: {agent_to_edit}")
 
-        # Mostrar prompt actual
+        # Mostrar prompt actual (o la última versión enviada en esta sesión)
         current_prompt = current_instructions[agent_to_edit]
+        prompt_key = f"prompt_{agent_to_edit}"
+        saved_prompt = st.session_state.get(prompt_key, current_prompt)
 
         # Tabs para edición
         edit_tab1, edit_tab2 = st.tabs(["✏️ Editor", "👀 Preview"])
 
         with edit_tab1:
-            # Editor de texto
-            new_prompt = st.text_area(
-                "Instrucciones del agente:",
-                value=current_prompt,
-                height=300,
-                help="Define cómo debe comportarse este agente"
-            )
-
-            # Botones de acción
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                if st.button("💾 Guardar Cambios"):
-                    # Aquí se guardarían los cambios
-                    # En una implementación real, esto modificaría el código fuente o una base de datos
-                    st.success("✅ Cambios guardados (simulado)")
-                    st.info("🔄 Reinicia la aplicación para aplicar los cambios")
-
-            with col2:
-                if st.button("🔄 Restaurar Original"):
-                    st.session_state[f"prompt_{agent_to_edit}"] = current_prompt
-                    st.success("✅ Prompt restaurado al original")
-
-            with col3:
-                if st.button("📤 Exportar Prompt"):
-                    st.download_button(
-                        label="💾 Descargar",
-                        data=new_prompt,
-                        file_name=f"{agent_to_edit}_prompt.txt",
-                        mime="text/plain"
-                    )
+            # Formulario: las ediciones no re-ejecutan la página hasta enviarlas
+            with st.form("prompt_edit_form", clear_on_submit=False):
+                # Editor de texto
+                new_prompt = st.text_area(
+                    "Instrucciones del agente:",
+                    value=saved_prompt,
+                    height=300,
+                    help="Define cómo debe comportarse este agente"
+                )
+
+                # Botones de acción
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    save_clicked = st.form_submit_button("💾 Guardar Cambios")
+
+                with col2:
+                    restore_clicked = st.form_submit_button("🔄 Restaurar Original")
+
+                with col3:
+                    export_clicked = st.form_submit_button("📤 Exportar Prompt")
+
+            if save_clicked:
+                st.session_state[prompt_key] = new_prompt
+                # Aquí se guardarían los cambios
+                # En una implementación real, esto modificaría el código fuente o una base de datos
+                st.success("✅ Cambios guardados (simulado)")
+                st.info("🔄 Reinicia la aplicación para aplicar los cambios")
+
+            if restore_clicked:
+                st.session_state[prompt_key] = current_prompt
+                st.toast("✅ Prompt restaurado al original")
+                st.rerun()
+
+            if export_clicked:
+                st.session_state[prompt_key] = new_prompt
+                st.download_button(
+                    label="💾 Descargar",
+                    data=new_prompt,
+                    file_name=f"{agent_to_edit}_prompt.txt",
+                    mime="text/plain"
+                )
+
+        # El preview y su análisis solo cambian al enviar el formulario
+        new_prompt = st.session_state.get(prompt_key, current_prompt)
 
         with edit_tab2:
             # Preview del prompt
@@ -216,31 +246,42 @@ def show_prompts_editor(config_manager):
 
             col1, col2, col3 = st.columns(3)
 
+            analysis = _analyze_prompt(new_prompt)
+
             with col1:
-                st.metric("📝 Caracteres", len(new_prompt))
+                st.metric("📝 Caracteres", analysis['chars'])
 
             with col2:
-                st.metric("🔤 Palabras", len(new_prompt.split()))
+                st.metric("🔤 Palabras", analysis['words'])
 
             with col3:
-                st.metric("📄 Líneas", len(new_prompt.split('\n')))
+                st.metric("📄 Líneas", analysis['lines'])
 
             # Verificaciones de calidad
             st.markdown("### ✅ Verificaciones de Calidad")
 
-            checks = {
-                "Tiene instrucciones claras": "TASK:" in new_prompt or "RULES:" in new_prompt,
-                "Menciona preservación de contenido": "preserve" in new_prompt.lower() or "100%" in new_prompt,
-                "Define formato de salida": "format" in new_prompt.lower() or "output" in new_prompt.lower(),
-                "Incluye ejemplos": "ejemplo" in new_prompt.lower() or "example" in new_prompt.lower()
-            }
-
-            for check, passed in checks.items():
+            for check, passed in analysis['checks'].items():
                 if passed:
                     st.success(f"✅ {check}")
                 else:
                     st.warning(f"⚠️ {check}")
 
+@st.cache_data(max_entries=16, show_spinner=False)
+def _analyze_prompt(prompt: str) -> dict:
+    """Métricas y verificaciones de calidad de un prompt, una vez por texto."""
+    prompt_lower = prompt.lower()
+    return {
+        'chars': len(prompt),
+        'words': len(prompt.split()),
+        'lines': prompt.count('\n') + 1,
+        'checks': {
+            "Tiene instrucciones claras": "TASK:" in prompt or "RULES:" in prompt,
+            "Menciona preservación de contenido": "preserve" in prompt_lower or "100%" in prompt,
+            "Define formato de salida": "format" in prompt_lower or "output" in prompt_lower,
+            "Incluye ejemplos": "ejemplo" in prompt_lower or "example" in prompt_lower
+        }
+    }
+
 def show_agent_testing():
     """Interfaz para probar agentes."""
 
@@ -248,42 +289,43 @@ def show_agent_testing():
 
     st.info("💡 Prueba los agentes con contenido de ejemplo para verificar su funcionamiento.")
 
-    # Selección de agente a probar
-    test_agent = st.selectbox(
-        "Agente a probar:",
-        options=["simple_processor", "meeting_processor"],
-        format_func=lambda x: {
-            'simple_processor': '📚 Simple Processor',
-            'meeting_processor': '👥 Meeting Processor'
-        }.get(x, x)
-    )
-
-    # Contenido de prueba
-    test_content = st.text_area(
-        "Contenido de prueba:",
-        height=150,
-        placeholder="Introduce contenido para probar el agente..."
-    )
+    # Formulario: escribir en el contenido de prueba no re-ejecuta la página
+    with st.form("agent_test_form"):
+        # Selección de agente a probar
+        test_agent = st.selectbox(
+            "Agente a probar:",
+            options=["simple_processor", "meeting_processor"],
+            format_func=lambda x: _TEST_AGENT_LABELS.get(x, x)
+        )
 
-    # Configuración de prueba
-    with st.expander("⚙️ Configuración de Prueba"):
-        use_mock_mode = st.checkbox(
-            "Modo simulación",
-            value=True,
-            help="Simula la respuesta del agente sin usar la API real"
+        # Contenido de prueba
+        test_content = st.text_area(
+            "Contenido de prueba:",
+            height=150,
+            placeholder="Introduce contenido para probar el agente..."
         )
 
-        include_qa = st.checkbox("Incluir Q&A", value=True)
+        # Configuración de prueba
+        with st.expander("⚙️ Configuración de Prueba"):
+            use_mock_mode = st.checkbox(
+                "Modo simulación",
+                value=True,
+                help="Simula la respuesta del agente sin usar la API real"
+            )
 
-        test_segments = st.slider(
-            "Número de segmentos a simular:",
-            min_value=1,
-            max_value=5,
-            value=1
-        )
+            include_qa = st.checkbox("Incluir Q&A", value=True)
 
-    # Botón de prueba
-    if st.button("🚀 Ejecutar Prueba"):
+            test_segments = st.slider(
+                "Número de segmentos a simular:",
+                min_value=1,
+                max_value=5,
+                value=1
+            )
+
+        # Botón de prueba
+        submitted = st.form_submit_button("🚀 Ejecutar Prueba")
+
+    if submitted:
         if not test_content.strip():
             st.error("❌ Introduce contenido para probar")
             return
@@ -299,6 +341,9 @@ def show_agent_testing():
 def simulate_agent_test(agent_name, content, include_qa, segments):
     """Simula el resultado de probar un agente."""
 
+    original_words = len(content.split())
+    preview = content[:200]
+
     if agent_name == "simple_processor":
         return {
             "agent": "simple_processor",
@@ -308,7 +353,7 @@ def simulate_agent_test(agent_name, content, include_qa, segments):
 
 ## Segmento 1: Resumen del Tema Principal
 
-{content[:200]}...
+{preview}...
 
 **Puntos clave:**
 - Información estructurada y clara
@@ -324,8 +369,8 @@ def simulate_agent_test(agent_name, content, include_qa, segments):
 **Respuesta:** Los aspectos más relevantes incluyen...
 """,
             "metrics": {
-                "original_words": len(content.split()),
-                "processed_words": len(content.split()) + 50,
+                "original_words": original_words,
+                "processed_words": original_words + 50,
                 "segments": segments,
                 "qa_questions": 4 if include_qa else 0
             }
@@ -357,8 +402,8 @@ def simulate_agent_test(agent_name, content, include_qa, segments):
 **Respuesta:** Se decidió implementar [solución específica]...
 """,
             "metrics": {
-                "original_words": len(content.split()),
-                "processed_words": len(content.split()) + 75,
+                "original_words": original_words,
+                "processed_words": original_words + 75,
                 "segments": segments,
                 "decisions": 2,
                 "action_items": 3
@@ -6,10 +6,45 @@ Utilidades para validar configuraciones, contenido y parámetros.
 """
 
 import re
-import yaml
+import copy
+import functools
 from typing import Dict, List, Tuple, Any, Optional
 from pathlib import Path
-import requests
+
+# requests y yaml se importan bajo demanda: solo test_connection y
+# validate_yaml_config los necesitan
+
+# Reglas de API key por proveedor: (nombre, prefijo, longitud mínima, placeholder)
+_API_KEY_RULES = {
+    'azure': ("Azure", None, 20, "YOUR_AZURE_API_KEY_HERE"),
+    'openai': ("OpenAI", "sk-", 40, None),
+    'anthropic': ("Anthropic", "sk-ant-", 40, None),
+}
+
+# Modelos válidos por proveedor (orden de presentación en los mensajes)
+_VALID_MODELS = {
+    'azure': ('gpt-4.1', 'gpt-4o', 'gpt-4'),
+    'openai': ('gpt-4o', 'gpt-4', 'o1-mini', 'o3-mini'),
+    'anthropic': ('haiku', 'sonnet', 'opus'),
+    'generic': ('llama3.1', 'mistral', 'codellama')  # Ollama
+}
+_VALID_MODEL_SETS = {provider: frozenset(models) for provider, models in _VALID_MODELS.items()}
+
+# Formato básico de URL, compilado una sola vez
+_URL_RE = re.compile(
+    r'^https?://'  # http:// o https://
+    r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # dominio
+    r'localhost|'  # localhost
+    r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # IP
+    r'(?::\d+)?'  # puerto opcional
+    r'(?:/?|[/?]\S+)$', re.IGNORECASE)
+
+# Muletillas típicas de una transcripción STT (búsqueda como subcadena,
+# igual que el antiguo `indicator in content.lower()`)
+_STT_RE = re.compile(r'eh|bueno|entonces|mm|ah|este', re.IGNORECASE)
+
+# Palabras frecuentes del español para detectar el idioma
+_SPANISH_WORDS = frozenset({'que', 'es', 'el', 'la', 'de', 'en', 'un', 'para', 'con', 'por'})
 
 def validate_api_key(api_key: str, provider: str) -> Tuple[bool, str]:
     """
@@ -26,37 +61,25 @@ def validate_api_key(api_key: str, provider: str) -> Tuple[bool, str]:
     if not api_key or api_key.strip() == "":
         return False, "API key no puede estar vacía"
 
-    # Validaciones específicas por proveedor
-    if provider == "azure":
-        if api_key == "YOUR_AZURE_API_KEY_HERE":
-            return False, "Debes reemplazar el placeholder con tu API key real"
-
-        if len(api_key) < 20:
-            return False, "Azure API key parece demasiado corta"
-
-        return True, "API key válida"
-
-    elif provider == "openai":
-        if not api_key.startswith("sk-"):
-            return False, "OpenAI API key debe comenzar con 'sk-'"
-
-        if len(api_key) < 40:
-            return False, "OpenAI API key parece demasiado corta"
+    if provider == "generic":  # Ollama
+        # Ollama no requiere validación especial
+        return True, "Configuración válida"
 
+    rules = _API_KEY_RULES.get(provider)
+    if rules is None:
         return True, "API key válida"
 
-    elif provider == "anthropic":
-        if not api_key.startswith("sk-ant-"):
-            return False, "Anthropic API key debe comenzar con 'sk-ant-'"
+    # Validaciones específicas por proveedor
+    label, prefix, min_length, placeholder = rules
 
-        if len(api_key) < 40:
-            return False, "Anthropic API key parece demasiado corta"
+    if placeholder is not None and api_key == placeholder:
+        return False, "Debes reemplazar el placeholder con tu API key real"
 
-        return True, "API key válida"
+    if prefix is not None and not api_key.startswith(prefix):
+        return False, f"{label} API key debe comenzar con '{prefix}'"
 
-    elif provider == "generic":  # Ollama
-        # Ollama no requiere validación especial
-        return True, "Configuración válida"
+    if len(api_key) < min_length:
+        return False, f"{label} API key parece demasiado corta"
 
     return True, "API key válida"
 
@@ -76,15 +99,7 @@ def validate_url(url: str, url_type: str = "general") -> Tuple[bool, str]:
         return False, "URL no puede estar vacía"
 
     # Validación básica de formato
-    url_pattern = re.compile(
-        r'^https?://'  # http:// o https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # dominio
-        r'localhost|'  # localhost
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # IP
-        r'(?::\d+)?'  # puerto opcional
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-
-    if not url_pattern.match(url):
+    if not _URL_RE.match(url):
         return False, "Formato de URL inválido"
 
     # Validaciones específicas por tipo
@@ -143,20 +158,18 @@ def validate_content(content: str) -> Tuple[bool, str, Dict[str, Any]]:
     warnings = []
 
     # Verificar si parece transcripción STT
-    stt_indicators = ['eh', 'bueno', 'entonces', 'mm', 'ah', 'este']
-    has_stt_indicators = any(indicator in content.lower() for indicator in stt_indicators)
+    has_stt_indicators = _STT_RE.search(content) is not None
 
     if not has_stt_indicators:
         warnings.append("El contenido no parece una transcripción STT típica")
 
     # Verificar puntuación limitada (característico de STT)
-    punctuation_ratio = sum(1 for char in content if char in '.,!?;:') / char_count
+    punctuation_ratio = sum(content.count(char) for char in '.,!?;:') / char_count
     if punctuation_ratio > 0.05:
         warnings.append("El contenido ya tiene mucha puntuación (¿ya está procesado?)")
 
     # Verificar idioma predominante (español esperado)
-    spanish_words = ['que', 'es', 'el', 'la', 'de', 'en', 'un', 'para', 'con', 'por']
-    spanish_count = sum(1 for word in words[:100] if word.lower() in spanish_words)
+    spanish_count = sum(1 for word in words[:100] if word.lower() in _SPANISH_WORDS)
 
     if spanish_count < 5:
         warnings.append("El contenido no parece estar en español")
@@ -192,23 +205,32 @@ def validate_rate_limiting_config(config: Dict[str, Any]) -> Tuple[bool, str]:
         if not isinstance(config[field], (int, float)):
             return False, f"Campo {field} debe ser numérico"
 
-    # Validaciones de rangos
-    validations = [
-        (config['requests_per_minute'] > 0, "requests_per_minute debe ser mayor a 0"),
-        (config['requests_per_minute'] <= 60, "requests_per_minute no debe exceder 60"),
-        (config['delay_between_requests'] >= 0, "delay_between_requests debe ser >= 0"),
-        (config['delay_between_requests'] <= 300, "delay_between_requests no debe exceder 300s"),
-        (config['max_tokens_per_request'] > 0, "max_tokens_per_request debe ser mayor a 0"),
-        (config['max_tokens_per_request'] <= 150000, "max_tokens_per_request no debe exceder 150,000"),
-        (config['backoff_factor'] >= 1.0, "backoff_factor debe ser >= 1.0"),
-        (config['backoff_factor'] <= 10.0, "backoff_factor no debe exceder 10.0"),
-        (config['max_backoff'] >= 60, "max_backoff debe ser >= 60s"),
-        (config['max_backoff'] <= 3600, "max_backoff no debe exceder 1 hora")
-    ]
-
-    for is_valid, message in validations:
-        if not is_valid:
-            return False, message
+    # Validaciones de rangos (se detiene en el primer fallo)
+    if config['requests_per_minute'] <= 0:
+        return False, "requests_per_minute debe ser mayor a 0"
+    if config['requests_per_minute'] > 60:
+        return False, "requests_per_minute no debe exceder 60"
+    if config['delay_between_requests'] < 0:
+        return False, "delay_between_requests debe ser >= 0"
+    if config['delay_between_requests'] > 300:
+        return False, "delay_between_requests no debe exceder 300s"
+    if config['max_tokens_per_request'] <= 0:
+        return False, "max_tokens_per_request debe ser mayor a 0"
+    if config['max_tokens_per_request'] > 150000:
+        return False, "max_tokens_per_request no debe exceder 150,000"
+    if config['backoff_factor'] < 1.0:
+        return False, "backoff_factor debe ser >= 1.0"
+    if config['backoff_factor'] > 10.0:
+        return False, "backoff_factor no debe exceder 10.0"
+    if config['max_backoff'] < 60:
+        return False, "max_backoff debe ser >= 60s"
+    if config['max_backoff'] > 3600:
+        return False, "max_backoff no debe exceder 1 hora"
+
+    # Campo opcional: configuraciones anteriores no lo incluyen
+    concurrency = config.get('max_concurrent_segments', 4)
+    if not isinstance(concurrency, int) or not 1 <= concurrency <= 16:
+        return False, "max_concurrent_segments debe ser un entero entre 1 y 16"
 
     # Validaciones de lógica
     if config['delay_between_requests'] > config['max_backoff']:
@@ -243,13 +265,16 @@ def validate_file_upload(file_content: bytes, file_name: str, max_size_mb: int =
 
     # Validar contenido para archivos de texto
     if file_extension in {'.txt', '.md'}:
+        # Una sola decodificación, reutilizada para comprobar que no está vacío
         try:
-            content = file_content.decode('utf-8')
-            if len(content.strip()) == 0:
-                return False, "Archivo de texto está vacío"
+            text = file_content.decode('utf-8')
         except UnicodeDecodeError:
             return False, "Archivo de texto no está en formato UTF-8"
 
+        # str.isspace no crea copias y reconoce también espacios Unicode
+        if not text or text.isspace():
+            return False, "Archivo de texto está vacío"
+
     return True, "Archivo válido"
 
 def validate_model_name(model_name: str, available_providers: List[str]) -> Tuple[bool, str]:
@@ -278,15 +303,9 @@ def validate_model_name(model_name: str, available_providers: List[str]) -> Tupl
         return False, f"Proveedor '{provider}' no está configurado"
 
     # Validaciones específicas por proveedor
-    valid_models = {
-        'azure': ['gpt-4.1', 'gpt-4o', 'gpt-4'],
-        'openai': ['gpt-4o', 'gpt-4', 'o1-mini', 'o3-mini'],
-        'anthropic': ['haiku', 'sonnet', 'opus'],
-        'generic': ['llama3.1', 'mistral', 'codellama']  # Ollama
-    }
-
-    if provider in valid_models and model not in valid_models[provider]:
-        available = ', '.join(valid_models[provider])
+    allowed = _VALID_MODEL_SETS.get(provider)
+    if allowed is not None and model not in allowed:
+        available = ', '.join(_VALID_MODELS[provider])
         return False, f"Modelo '{model}' no válido para {provider}. Disponibles: {available}"
 
     return True, "Modelo válido"
@@ -302,6 +321,7 @@ def test_connection(provider: str, config: Dict[str, Any]) -> Tuple[bool, str]:
     Returns:
         Tuple (conexión_exitosa, mensaje)
     """
+    import requests
 
     try:
         if provider == "generic":  # Ollama
@@ -311,7 +331,7 @@ def test_connection(provider: str, config: Dict[str, Any]) -> Tuple[bool, str]:
 
             # Probar endpoint de Ollama
             test_url = base_url.replace('/v1', '/api/tags')
-            response = requests.get(test_url, timeout=5)
+            response = _http_session().get(test_url, timeout=5)
 
             if response.status_code == 200:
                 return True, "Conexión exitosa con Ollama"
@@ -346,6 +366,27 @@ def test_connection(provider: str, config: Dict[str, Any]) -> Tuple[bool, str]:
     except Exception as e:
         return False, f"Error inesperado: {e}"
 
+@functools.lru_cache(maxsize=1)
+def _http_session():
+    """Sesión HTTP compartida: las pruebas de conexión repetidas reutilizan sockets."""
+    import requests
+
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+@functools.lru_cache(maxsize=32)
+def _load_yaml_cached(path: str, mtime: float, size: int) -> Any:
+    """Parsea un YAML; mtime y size forman parte de la clave de caché."""
+    import yaml
+
+    # Parser C de libyaml cuando está disponible
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    with open(path, 'r', encoding='utf-8') as f:
+        return yaml.load(f, Loader=loader)
+
 def validate_yaml_config(config_path: str) -> Tuple[bool, str, Optional[Dict]]:
     """
     Valida archivo de configuración YAML.
@@ -356,13 +397,15 @@ def validate_yaml_config(config_path: str) -> Tuple[bool, str, Optional[Dict]]:
     Returns:
         Tuple (es_válido, mensaje, configuración_parseada)
     """
+    import yaml
 
     try:
         if not Path(config_path).exists():
             return False, f"Archivo no existe: {config_path}", None
 
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+        # El parseo se reutiliza mientras el archivo no cambie
+        stat = Path(config_path).stat()
+        config = copy.deepcopy(_load_yaml_cached(str(config_path), stat.st_mtime, stat.st_size))
 
         if not isinstance(config, dict):
             return False, "Configuración debe ser un diccionario YAML", None
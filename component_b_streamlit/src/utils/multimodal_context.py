@@ -2,13 +2,42 @@
 Manejo real de contexto multimodal para agentes
 """
 
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import List, Dict, Optional
-import pypdf
+from typing import Callable, Iterable, List, Dict, Tuple
+import codecs
 import logging
+import mmap
+import os
+import pypdf
+import threading
+
+# PyMuPDF extrae texto en C y es mucho más rápido que pypdf; es opcional
+try:
+    import fitz
+except ImportError:
+    fitz = None
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.md', '.docx')
+
+# BOMs de texto reconocidos; UTF-32 va antes que UTF-16 porque lo contiene
+TEXT_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Cabeceras esperadas de los formatos binarios
+MAGIC_BYTES = {'.pdf': b'%PDF-', '.docx': b'PK\x03\x04'}
+
+# Documentos extraídos que conserva cada builder
+DOC_CACHE_SIZE = 32
+
 
 class MultimodalContextBuilder:
     """
@@ -17,6 +46,9 @@ class MultimodalContextBuilder:
 
     def __init__(self, max_chars_per_doc: int = 10000):
         self.max_chars_per_doc = max_chars_per_doc
+        # (ruta, mtime_ns, tamaño) -> contenido extraído
+        self._content_cache: Dict[Tuple[str, int, int], str] = {}
+        self._cache_lock = threading.Lock()
 
     def build_context(
         self,
@@ -44,8 +76,7 @@ class MultimodalContextBuilder:
         # Agregar contenido real de documentos
         if uploaded_docs:
             context_parts.append("=== REFERENCE DOCUMENTS ===")
-            for doc_path in uploaded_docs:
-                doc_content = self._extract_document_content(doc_path)
+            for doc_path, doc_content in zip(uploaded_docs, self._extract_many(uploaded_docs)):
                 if doc_content:
                     context_parts.extend([
                         f"\n--- {doc_path.name} ---",
@@ -55,14 +86,53 @@ class MultimodalContextBuilder:
 
         return "\n".join(context_parts)
 
+    def _extract_many(self, doc_paths: List[Path]) -> List[str]:
+        """
+        Extrae varios documentos en paralelo conservando el orden de entrada
+        """
+        # Un solo documento no compensa el coste de crear el pool
+        if len(doc_paths) == 1:
+            return [self._extract_document_content(doc_paths[0])]
+
+        # El parseo de PDF/DOCX libera el GIL en sus extensiones C
+        with ThreadPoolExecutor(max_workers=min(8, len(doc_paths))) as executor:
+            return list(executor.map(self._extract_document_content, doc_paths))
+
     def _extract_document_content(self, doc_path: Path) -> str:
         """
-        Extrae contenido de documento según tipo
+        Extrae contenido de documento según tipo, reutilizando extracciones previas
         """
         if not doc_path.exists():
             logger.warning(f"Document not found: {doc_path}")
             return ""
 
+        # mtime y tamaño forman parte de la clave: un archivo editado se vuelve a leer
+        try:
+            stat = doc_path.stat()
+        except OSError:
+            return self._extract_by_type(doc_path)
+        key = (str(doc_path), stat.st_mtime_ns, stat.st_size)
+
+        with self._cache_lock:
+            content = self._content_cache.get(key)
+        if content is not None:
+            return content
+
+        content = self._extract_by_type(doc_path)
+
+        # Los errores no se cachean para poder reintentar
+        if not content.startswith("[Error"):
+            with self._cache_lock:
+                self._content_cache[key] = content
+                if len(self._content_cache) > DOC_CACHE_SIZE:
+                    del self._content_cache[next(iter(self._content_cache))]
+
+        return content
+
+    def _extract_by_type(self, doc_path: Path) -> str:
+        """
+        Extrae contenido de documento según tipo
+        """
         try:
             if doc_path.suffix.lower() == '.pdf':
                 return self._extract_pdf(doc_path)
@@ -79,51 +149,84 @@ class MultimodalContextBuilder:
 
     def _extract_pdf(self, pdf_path: Path) -> str:
         """
-        Extrae texto de PDF usando pypdf
+        Extrae texto de PDF usando PyMuPDF si está instalado, o pypdf
         """
         try:
+            if fitz is not None:
+                doc = fitz.open(str(pdf_path))
+                try:
+                    return self._join_pdf_pages(
+                        pdf_path,
+                        doc.page_count,
+                        (partial(page.get_text, "text") for page in doc)
+                    )
+                finally:
+                    doc.close()
+
             reader = pypdf.PdfReader(pdf_path)
-            text_parts = []
+            return self._join_pdf_pages(
+                pdf_path,
+                len(reader.pages),
+                (page.extract_text for page in reader.pages)
+            )
 
-            # Verificar si el PDF tiene contenido
-            if len(reader.pages) == 0:
-                return "[PDF vacío o corrupto]"
+        except Exception as e:
+            logger.error(f"Error reading PDF {pdf_path}: {e}")
+            return f"[Error extrayendo PDF: {str(e)}]"
 
-            for page_num, page in enumerate(reader.pages, 1):
-                try:
-                    text = page.extract_text()
-                    if text.strip():  # Solo agregar páginas con contenido
-                        text_parts.append(f"[Page {page_num}]\n{text.strip()}")
+    def _join_pdf_pages(
+        self,
+        pdf_path: Path,
+        page_count: int,
+        page_texts: Iterable[Callable[[], str]]
+    ) -> str:
+        """
+        Une el texto de las páginas con cabeceras [Page N], sea cual sea el backend
+        """
+        text_parts = []
+        # Longitud del texto unido, sin volver a unirlo en cada página
+        total_len = -2
 
-                    # Limitar tamaño total
-                    full_text = "\n\n".join(text_parts)
-                    if len(full_text) > self.max_chars_per_doc:
-                        return full_text[:self.max_chars_per_doc] + "\n\n[... contenido truncado por límite de tamaño]"
+        # Verificar si el PDF tiene contenido
+        if page_count == 0:
+            return "[PDF vacío o corrupto]"
 
-                except Exception as e:
-                    logger.warning(f"Error extracting page {page_num} from {pdf_path}: {e}")
-                    text_parts.append(f"[Page {page_num}] - Error extrayendo contenido")
+        for page_num, extract_text in enumerate(page_texts, 1):
+            try:
+                text = extract_text()
+                if text.strip():  # Solo agregar páginas con contenido
+                    text_parts.append(f"[Page {page_num}]\n{text.strip()}")
+                    total_len += len(text_parts[-1]) + 2
 
-            if not text_parts:
-                return "[PDF sin contenido extraíble - posiblemente imágenes o texto protegido]"
+                # Limitar tamaño total
+                if total_len > self.max_chars_per_doc:
+                    full_text = "\n\n".join(text_parts)
+                    return full_text[:self.max_chars_per_doc] + "\n\n[... contenido truncado por límite de tamaño]"
 
-            return "\n\n".join(text_parts)
+            except Exception as e:
+                logger.warning(f"Error extracting page {page_num} from {pdf_path}: {e}")
+                text_parts.append(f"[Page {page_num}] - Error extrayendo contenido")
+                total_len += len(text_parts[-1]) + 2
 
-        except Exception as e:
-            logger.error(f"Error reading PDF {pdf_path}: {e}")
-            return f"[Error extrayendo PDF: {str(e)}]"
+        if not text_parts:
+            return "[PDF sin contenido extraíble - posiblemente imágenes o texto protegido]"
+
+        return "\n\n".join(text_parts)
 
     def _extract_text_file(self, file_path: Path) -> str:
         """
         Extrae contenido de archivos de texto plano
         """
         try:
-            # Intentar diferentes encodings
-            encodings = ['utf-8', 'latin-1', 'cp1252']
+            raw, partial_read = self._read_text_prefix(file_path)
 
-            for encoding in encodings:
+            for encoding in self._candidate_encodings(raw):
                 try:
-                    content = file_path.read_text(encoding=encoding)
+                    # final=False tolera un carácter multibyte cortado al final del prefijo
+                    decoder = codecs.getincrementaldecoder(encoding)()
+                    content = decoder.decode(raw, final=not partial_read)
+                    # Saltos de línea universales, como hacía read_text
+                    content = content.replace('\r\n', '\n').replace('\r', '\n')
                     # Limitar tamaño
                     if len(content) > self.max_chars_per_doc:
                         content = content[:self.max_chars_per_doc] + "\n\n[... contenido truncado por límite de tamaño]"
@@ -138,6 +241,36 @@ class MultimodalContextBuilder:
             logger.error(f"Error reading text file {file_path}: {e}")
             return f"[Error leyendo archivo de texto: {str(e)}]"
 
+    @staticmethod
+    def _candidate_encodings(raw: bytes) -> List[str]:
+        """
+        Encodings a probar, en orden, para los bytes de un archivo de texto
+        """
+        # Un BOM determina el encoding sin necesidad de adivinar
+        for bom, encoding in TEXT_BOMS:
+            if raw.startswith(bom):
+                return [encoding]
+
+        # latin-1 nunca falla: garantiza un resultado
+        return ['utf-8', 'latin-1', 'cp1252']
+
+    def _read_text_prefix(self, file_path: Path) -> Tuple[bytes, bool]:
+        """
+        Lee solo los bytes necesarios para max_chars_per_doc caracteres.
+
+        Retorna (bytes, leído_parcialmente). Usa mmap para que el sistema
+        cargue bajo demanda únicamente el prefijo, no el archivo completo.
+        """
+        # Hasta 4 bytes por carácter en UTF-8, con margen para el corte y \r\n
+        limit = (self.max_chars_per_doc + 2) * 4
+
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return b"", False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm[:limit], size > limit
+
     def _extract_docx(self, docx_path: Path) -> str:
         """
         Extrae contenido de archivos DOCX (requiere python-docx)
@@ -183,15 +316,15 @@ class MultimodalContextBuilder:
                 "size_bytes": stat.st_size,
                 "size_mb": round(stat.st_size / (1024*1024), 2),
                 "extension": doc_path.suffix.lower(),
-                "supported": doc_path.suffix.lower() in ['.pdf', '.txt', '.md', '.docx']
+                "supported": doc_path.suffix.lower() in SUPPORTED_EXTENSIONS
             }
 
             # Información específica por tipo
             if doc_path.suffix.lower() == '.pdf':
                 try:
-                    reader = pypdf.PdfReader(doc_path)
-                    summary["pages"] = len(reader.pages)
-                    summary["metadata"] = reader.metadata
+                    summary["pages"], summary["metadata"] = _pdf_info(
+                        str(doc_path), stat.st_mtime_ns, stat.st_size
+                    )
                 except:
                     summary["pages"] = "unknown"
                     summary["metadata"] = {}
@@ -203,51 +336,132 @@ class MultimodalContextBuilder:
 
     def validate_documents(self, doc_paths: List[Path]) -> Dict[str, List[Path]]:
         """
-        Valida una lista de documentos y los categoriza
+        Valida una lista de documentos y los categoriza sin extraer su contenido
+        """
+        outcomes = [(self.probe_document(doc_path), "") for doc_path in doc_paths]
+        result = self.group_extractions(doc_paths, outcomes)
+        del result["contents"]
+        return result
+
+    def probe_document(self, doc_path: Path) -> str:
+        """
+        Clasifica un documento con comprobaciones baratas.
+
+        Revisa existencia, extensión, tamaño y cabecera; de los PDFs solo
+        lee la tabla de páginas, no los flujos de contenido.
+        """
+        if not doc_path.exists():
+            return "missing"
+        suffix = doc_path.suffix.lower()
+        if suffix not in SUPPORTED_EXTENSIONS:
+            return "unsupported"
+
+        try:
+            if doc_path.stat().st_size == 0:
+                return "invalid"
+
+            magic = MAGIC_BYTES.get(suffix)
+            if magic:
+                # La especificación PDF admite la cabecera dentro del primer KB
+                with open(doc_path, 'rb') as f:
+                    if magic not in f.read(1024):
+                        return "invalid"
+
+            # Abrir el PDF valida su estructura aunque no tenga páginas
+            if suffix == '.pdf':
+                stat = doc_path.stat()
+                _pdf_info(str(doc_path), stat.st_mtime_ns, stat.st_size)
+        except Exception:
+            return "invalid"
+
+        return "valid"
+
+    def classify_document(self, doc_path: Path) -> Tuple[str, str]:
+        """
+        Clasifica y extrae un único documento.
+
+        Retorna (categoría, contenido); el contenido sólo se rellena
+        para documentos válidos. Es independiente por documento, por lo
+        que puede ejecutarse en paralelo.
+        """
+        if not doc_path.exists():
+            return "missing", ""
+        if doc_path.suffix.lower() not in SUPPORTED_EXTENSIONS:
+            return "unsupported", ""
+
+        try:
+            content = self._extract_document_content(doc_path)
+        except Exception:
+            return "invalid", ""
+
+        if content and not content.startswith("[Error"):
+            return "valid", content
+        return "invalid", ""
+
+    @staticmethod
+    def group_extractions(
+        doc_paths: List[Path],
+        outcomes: List[Tuple[str, str]]
+    ) -> Dict[str, any]:
+        """
+        Agrupa los resultados de classify_document por categoría,
+        respetando el orden original de los documentos
         """
         result = {
             "valid": [],
             "invalid": [],
             "unsupported": [],
-            "missing": []
+            "missing": [],
+            "contents": {}
         }
 
-        for doc_path in doc_paths:
-            if not doc_path.exists():
-                result["missing"].append(doc_path)
-            elif doc_path.suffix.lower() not in ['.pdf', '.txt', '.md', '.docx']:
-                result["unsupported"].append(doc_path)
-            else:
-                try:
-                    # Intentar extraer una muestra pequeña
-                    test_content = self._extract_document_content(doc_path)
-                    if test_content and not test_content.startswith("[Error"):
-                        result["valid"].append(doc_path)
-                    else:
-                        result["invalid"].append(doc_path)
-                except:
-                    result["invalid"].append(doc_path)
+        for doc_path, (category, content) in zip(doc_paths, outcomes):
+            result[category].append(doc_path)
+            if category == "valid":
+                result["contents"][doc_path] = content
 
         return result
 
 
+@lru_cache(maxsize=32)
+def _pdf_info(path: str, mtime_ns: int, size: int) -> Tuple[int, Dict]:
+    """
+    Número de páginas y metadatos de un PDF, sin extraer su texto.
+
+    mtime_ns y size forman parte de la clave de caché, de modo que
+    validate_documents y get_document_summary abren cada PDF una sola vez.
+    Se cachean copias planas de los metadatos, no objetos ligados al lector,
+    para no retener el PDF completo en memoria.
+    """
+    if fitz is not None:
+        with fitz.open(path) as doc:
+            return doc.page_count, dict(doc.metadata or {})
+    reader = pypdf.PdfReader(path)
+    metadata = reader.metadata or {}
+    # Indexar resuelve las referencias indirectas; items() las devolvería sin resolver
+    return len(reader.pages), {key: metadata[key] for key in metadata}
+
+
+@lru_cache(maxsize=4)
+def _shared_builder(max_chars: int = 10000) -> MultimodalContextBuilder:
+    """Builder compartido por las funciones de conveniencia (y su caché)"""
+    return MultimodalContextBuilder(max_chars_per_doc=max_chars)
+
+
 # Funciones de conveniencia para usar desde otros módulos
 def extract_pdf_content(pdf_path: Path, max_chars: int = 10000) -> str:
     """Función de conveniencia para extraer contenido de PDF"""
-    builder = MultimodalContextBuilder(max_chars_per_doc=max_chars)
-    return builder._extract_pdf(pdf_path)
+    return _shared_builder(max_chars)._extract_pdf(pdf_path)
 
 
 def extract_text_content(file_path: Path, max_chars: int = 10000) -> str:
     """Función de conveniencia para extraer contenido de texto"""
-    builder = MultimodalContextBuilder(max_chars_per_doc=max_chars)
-    return builder._extract_text_file(file_path)
+    return _shared_builder(max_chars)._extract_text_file(file_path)
 
 
 def build_multimodal_context(segment: dict, documents: List[Path]) -> str:
     """Función de conveniencia para construir contexto multimodal"""
-    builder = MultimodalContextBuilder()
-    return builder.build_context(segment, documents)
+    return _shared_builder().build_context(segment, documents)
 
 
 # Exportar clases y funciones principales
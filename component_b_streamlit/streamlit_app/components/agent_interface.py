@@ -10,14 +10,31 @@ import asyncio
 import streamlit as st
 import sys
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, BinaryIO
 import tempfile
+import shutil
 import os
+import re
+from datetime import datetime
 
 # Añadir el directorio padre para importar módulos de FastAgent
 parent_dir = Path(__file__).parent.parent.parent
 sys.path.append(str(parent_dir))
 
+# Primera línea que sirve de título: un encabezado # o ## o, en su defecto,
+# una línea de más de 10 caracteres que no empiece con negrita
+_TITLE_RE = re.compile(
+    r"^[^\S\n]*(?:(?P<heading>#{1,2}(?!#).*?)|(?P<line>(?!\*\*)\S.{9,}?\S))[^\S\n]*$",
+    re.MULTILINE
+)
+
+# Formato de la fecha de generación en la cabecera del documento
+_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Marcadores de inicio de Q&A ('preguntas' cubre también "preguntas y
+# respuestas" y los encabezados "## preguntas")
+_QA_START_RE = re.compile(r"preguntas|q&a", re.IGNORECASE)
+
 class AgentInterface:
     """Interfaz para comunicarse con FastAgent."""
     
@@ -233,7 +250,7 @@ class AgentInterface:
         context_parts = ["\n--- CONTEXTO MULTIMODAL ---"]
         
         for doc_path in documents:
-            doc_name = Path(doc_path).name
+            doc_name = os.path.basename(doc_path)
             context_parts.append(f"• Documento disponible: {doc_name}")
         
         context_parts.append("--- FIN CONTEXTO MULTIMODAL ---\n")
@@ -259,7 +276,7 @@ class AgentInterface:
         doc_parts.append(f"**Segmentos**: {len(processed_segments)}")
 
         if documents:
-            doc_parts.append(f"**Documentos de referencia**: {', '.join([Path(d).name for d in documents])}")
+            doc_parts.append(f"**Documentos de referencia**: {', '.join(map(os.path.basename, documents))}")
 
         doc_parts.append("\n---\n")
 
@@ -303,14 +320,13 @@ class AgentInterface:
     
     def _extract_title(self, content: str) -> str:
         """Extrae el título de un segmento procesado."""
-        lines = content.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('#') and not line.startswith('###'):
-                return line.lstrip('#').strip()
-            elif line and not line.startswith('**') and len(line) > 10:
-                return line[:50] + "..." if len(line) > 50 else line
-        return "Sin título"
+        match = _TITLE_RE.search(content)
+        if not match:
+            return "Sin título"
+        if match.group('heading') is not None:
+            return match.group('heading').lstrip('#').strip()
+        line = match.group('line')
+        return line[:50] + "..." if len(line) > 50 else line
     
     def _extract_content_without_qa(self, content: str) -> str:
         """Extrae el contenido principal SIN la sección de Q&A."""
@@ -344,40 +360,28 @@ class AgentInterface:
 
     def _extract_qa_content(self, content: str) -> str:
         """Extrae SOLO la sección Q&A de un segmento procesado."""
-        lines = content.split('\n')
-        qa_section = []
-        in_qa_section = False
-
-        # Marcadores de inicio de Q&A
-        qa_start_markers = [
-            'preguntas y respuestas',
-            'preguntas',
-            'q&a',
-            '## preguntas',
-            '### preguntas'
-        ]
-
-        for line in lines:
-            line_lower = line.lower().strip()
-
-            # Detectar inicio de sección Q&A
-            if not in_qa_section and any(marker in line_lower for marker in qa_start_markers):
-                in_qa_section = True
-                continue  # Saltar el header "Preguntas y Respuestas"
+        # La sección empieza tras la primera línea con un marcador de Q&A
+        # (el propio header "Preguntas y Respuestas" se omite)
+        match = _QA_START_RE.search(content)
+        if not match:
+            return ""
+        header_end = content.find('\n', match.end())
+        if header_end == -1:
+            return ""
 
-            # Una vez dentro, capturar todo hasta encontrar separador o fin
-            if in_qa_section:
-                # Detenerse en separadores de secciones
-                if line.strip() == '---' and len(qa_section) > 5:
-                    break
-                qa_section.append(line)
+        # Una vez dentro, capturar todo hasta encontrar separador o fin
+        qa_section = []
+        for line in content[header_end + 1:].split('\n'):
+            # Detenerse en separadores de secciones
+            if line.strip() == '---' and len(qa_section) > 5:
+                break
+            qa_section.append(line)
 
-        return '\n'.join(qa_section).strip() if qa_section else ""
+        return '\n'.join(qa_section).strip()
     
     def _get_timestamp(self) -> str:
         """Retorna timestamp formateado."""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return datetime.now().strftime(_TIMESTAMP_FORMAT)
 
     def _get_inter_segment_delay(self) -> int:
         """
@@ -424,10 +428,11 @@ class AgentInterface:
         }
         return descriptions.get(agent_name, "Agente no encontrado")
     
-    async def save_temp_file(self, content: bytes, suffix: str = ".tmp") -> str:
-        """Guarda contenido en un archivo temporal y retorna la ruta."""
+    def save_temp_file_stream(self, file_obj: BinaryIO, suffix: str = ".tmp") -> str:
+        """Copia un objeto tipo archivo a un temporal por bloques, sin materializarlo en bytes."""
+        file_obj.seek(0)
         with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-            tmp_file.write(content)
+            shutil.copyfileobj(file_obj, tmp_file, length=1 << 20)
             return tmp_file.name
     
     def cleanup_temp_files(self, file_paths: List[str]):
@@ -315,10 +315,8 @@ def process_content(agent_interface):
 
     if 'additional_files' in st.session_state and st.session_state.additional_files:
         for file in st.session_state.additional_files:
-            # Guardar archivo temporal
-            temp_path = run_async_in_streamlit(
-                agent_interface.save_temp_file(file.getvalue(), Path(file.name).suffix)
-            )
+            # Copiar el archivo subido a un temporal por bloques
+            temp_path = agent_interface.save_temp_file_stream(file, Path(file.name).suffix)
             document_paths.append(temp_path)
             temp_files.append(temp_path)
 
@@ -0,0 +1,59 @@
+"""
+Tests para el recorte del contexto multimodal por segmento
+"""
+
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.streamlit_interface.core.agent_interface import (
+    _keywords,
+    _relevant_context,
+    _split_context
+)
+
+
+CONTEXT = "\n".join([
+    "\n--- CONTEXTO MULTIMODAL ---",
+    "\n--- fotosintesis.txt ---\n",
+    "La clorofila absorbe la luz para producir glucosa en las hojas.",
+    "",
+    "\n--- mercados.txt ---\n",
+    "La inflación reduce el poder adquisitivo de los salarios.",
+    "",
+    "• Tipos no soportados: ['audio.mp3']",
+    "--- FIN CONTEXTO MULTIMODAL ---\n",
+])
+
+
+def test_header_is_its_own_passage():
+    """La cabecera del documento no arrastra al contenido como estructural"""
+    passages = _split_context(CONTEXT)
+    structural = [text for text, words in passages if words is None]
+
+    assert any("fotosintesis.txt" in text for text in structural)
+    assert not any("clorofila" in text for text in structural)
+
+
+def test_irrelevant_passage_is_dropped():
+    """Solo se conservan los pasajes que comparten palabras con el segmento"""
+    passages = _split_context(CONTEXT)
+    trimmed = _relevant_context(passages, "Hoy vemos cómo la clorofila capta la luz del sol.")
+
+    assert "clorofila absorbe" in trimmed
+    assert "inflación" not in trimmed
+    # Las cabeceras y avisos se mantienen siempre
+    assert "--- mercados.txt ---" in trimmed
+    assert "Tipos no soportados" in trimmed
+
+
+def test_stopwords_do_not_match():
+    """Las palabras vacías largas no relacionan pasajes con el segmento"""
+    passages = _split_context(CONTEXT)
+    trimmed = _relevant_context(passages, "Entonces, también podemos hablar sobre otras cosas.")
+
+    assert "clorofila" not in trimmed
+    assert "inflación" not in trimmed
+    assert _keywords("entonces también durante nosotros") == frozenset()
@@ -113,6 +113,20 @@ def test_extract_unsupported_file():
             temp_path.unlink()
 
 
+def test_extract_text_file_with_bom():
+    """Verifica que los archivos con BOM se decodifican con su encoding"""
+    builder = MultimodalContextBuilder()
+
+    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+        f.write("Transcripción en UTF-16".encode('utf-16'))
+        temp_path = Path(f.name)
+
+    try:
+        assert builder._extract_text_file(temp_path) == "Transcripción en UTF-16"
+    finally:
+        temp_path.unlink()
+
+
 def test_build_context_with_segment():
     """Verifica construcción de contexto con segmento"""
     builder = MultimodalContextBuilder()
@@ -146,6 +160,27 @@ def test_build_context_with_documents(temp_text_file):
     assert "archivo de prueba" in context
 
 
+def test_build_context_keeps_document_order(temp_text_file, temp_markdown_file):
+    """Verifica que la extracción en paralelo respeta el orden de los documentos"""
+    builder = MultimodalContextBuilder()
+
+    context = builder.build_context({"text": "Test segment"}, [temp_markdown_file, temp_text_file])
+
+    assert context.index(temp_markdown_file.name) < context.index(temp_text_file.name)
+    assert context.index("# Test Document") < context.index("archivo de prueba")
+
+
+def test_extraction_cache_invalidated_on_change(temp_text_file):
+    """Verifica que el contenido extraído se reutiliza hasta que el archivo cambia"""
+    builder = MultimodalContextBuilder()
+
+    first = builder._extract_document_content(temp_text_file)
+    assert builder._extract_document_content(temp_text_file) is first
+
+    temp_text_file.write_text("Contenido actualizado del archivo", encoding='utf-8')
+    assert builder._extract_document_content(temp_text_file) == "Contenido actualizado del archivo"
+
+
 def test_document_summary(temp_text_file):
     """Verifica generación de resumen de documento"""
     builder = MultimodalContextBuilder()
@@ -183,6 +218,36 @@ def test_validate_documents(temp_text_file, temp_markdown_file):
             unsupported_file.unlink()
 
 
+def test_validate_documents_checks_pdf_header():
+    """Verifica que un .pdf sin cabecera PDF se marca como inválido"""
+    builder = MultimodalContextBuilder()
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.pdf', delete=False) as f:
+        f.write("esto no es un PDF")
+        fake_pdf = Path(f.name)
+
+    try:
+        validation = builder.validate_documents([fake_pdf])
+        assert validation["invalid"] == [fake_pdf]
+    finally:
+        fake_pdf.unlink()
+
+
+def test_classify_and_group_documents(temp_text_file):
+    """Verifica validación y extracción en una sola pasada"""
+    builder = MultimodalContextBuilder()
+    missing_file = Path("/fake/path/missing.txt")
+    doc_paths = [temp_text_file, missing_file]
+
+    outcomes = [builder.classify_document(doc_path) for doc_path in doc_paths]
+    result = builder.group_extractions(doc_paths, outcomes)
+
+    assert result["valid"] == [temp_text_file]
+    assert result["missing"] == [missing_file]
+    assert "archivo de prueba" in result["contents"][temp_text_file]
+    assert missing_file not in result["contents"]
+
+
 def test_content_size_limiting():
     """Verifica que el contenido se limita según max_chars_per_doc"""
     builder = MultimodalContextBuilder(max_chars_per_doc=50)